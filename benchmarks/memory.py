@@ -0,0 +1,63 @@
+"""Memory per item of synced items, kept in each kind of store.
+
+Items are decoded from JSON the way history pages are, with a few projects
+and tags that are shared by many items. Run from the root of the repository
+with `python -m benchmarks.memory`.
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+
+from things_cloud.models.todo import TodoApiObject, TodoItem
+from things_cloud.store import CompactStore, ItemStore, LazyStore, MemoryStore
+from things_cloud.utils import Util
+
+
+def payloads(count: int) -> list[tuple[str, bytes]]:
+    projects = [Util.uuid() for _ in range(10)]
+    payloads = []
+    for n in range(count):
+        item = TodoItem(title=f"task {n}")
+        item.project = projects[n % len(projects)]
+        item.tags = [projects[n % 3]]
+        if n % 5 == 0:
+            item.note.value = f"note of task {n}"
+        raw = item._to_new().model_dump_json(by_alias=True).encode()
+        payloads.append((item.uuid, raw))
+    return payloads
+
+
+def measure(
+    store_type: Callable[[], ItemStore],
+    data: list[tuple[str, bytes]],
+    validate: bool,
+) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = store_type()
+    for uuid, raw in data:
+        store.add_payload(uuid, TodoApiObject.model_validate_json(raw), validate)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return size / len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    args = parser.parse_args()
+
+    data = payloads(args.items)
+    for store_type in (MemoryStore, LazyStore, CompactStore):
+        for validate in (True, False):
+            per_item = measure(store_type, data, validate)
+            mode = "validated" if validate else "trusted"
+            print(f"{store_type.__name__:<13}{mode:<10}{per_item / 1024:6.2f} KB/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture()
+def history_data_new() -> dict[str, Any]:
+    return {
+        "items": [
+            {
+                "aBCDiHyah4Uf0MQqp11jsX": {
+                    "p": {
+                        "ix": 1234,
+                        "cd": 1641234567,
+                        "icsd": None,
+                        "ar": [],
+                        "tir": None,
+                        "rmd": None,
+                        "pr": ["ABCd1ee0ykmXYZqT98huxa"],
+                        "rp": None,
+                        "rr": None,
+                        "dds": None,
+                        "tt": "test task",
+                        "tr": False,
+                        "tp": 0,
+                        "lt": False,
+                        "acrd": None,
+                        "ti": 0,
+                        "tg": [],
+                        "icp": False,
+                        "nt": {"ch": 0, "_t": "tx", "t": 1, "v": ""},
+                        "do": 0,
+                        "dl": [],
+                        "lai": None,
+                        "dd": None,
+                        "rt": [],
+                        "md": 1641234567,
+                        "ss": 0,
+                        "sr": None,
+                        "sp": None,
+                        "st": 1,
+                        "icc": 0,
+                        "ato": None,
+                        "sb": 0,
+                        "agr": [],
+                        "xx": {"sn": {}, "_t": "oo"},
+                    },
+                    "e": "Task6",
+                    "t": 0,
+                }
+            }
+        ],
+        "current-item-index": 1234,
+        "schema": 301,
+        "start-total-content-size": 1,  # fake
+        "end-total-content-size": 1234567,
+        "latest-total-content-size": 1234567,
+    }
+
+
+@pytest.fixture()
+def history_data_edit() -> dict[str, Any]:
+    return {
+        "items": [
+            {
+                "aBCDiHyah4Uf0MQqp11jsX": {
+                    "p": {"md": 1641234567.123456, "tt": "test updated"},
+                    "e": "Task6",
+                    "t": 1,
+                }
+            }
+        ],
+        "current-item-index": 1234,
+        "schema": 301,
+        "start-total-content-size": 1,
+        "end-total-content-size": 1234567,
+        "latest-total-content-size": 1234567,
+    }
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+from pydantic import SecretStr
+from pytest_httpx import HTTPXMock
+
+from things_cloud import AsyncThingsClient
+from things_cloud.api.account import Account, Credentials
+from things_cloud.api.queue import CommitQueue
+from things_cloud.api.transport import Transport
+from things_cloud.models.todo import TodoItem
+from things_cloud.store import MemoryStore
+
+
+@pytest.fixture()
+def account_id() -> uuid.UUID:
+    return uuid.uuid4()
+
+
+@pytest.fixture()
+def account(account_id: uuid.UUID, httpx_mock: HTTPXMock) -> Account:
+    credentials = Credentials(
+        email="johndoe@example.com", password=SecretStr("example_f0$'@")
+    )
+    httpx_mock.add_response(
+        200,
+        json={
+            "SLA-version-accepted": "5",
+            "email": "johndoe@example.com",
+            "history-key": str(account_id),
+            "issues": [],
+            "maildrop-email": "maildrop-does-not-exist@things.email",
+            "status": "SYAccountStatusActive",
+        },
+    )
+    account = asyncio.run(Account.alogin(credentials))
+    request = httpx_mock.get_request()
+    assert request
+    assert request.headers["Authorization"] == "Password example_f0%24'%40"
+    httpx_mock.reset()
+    return account
+
+
+def test_alogin(account_id: uuid.UUID, account: Account):
+    assert account._info.history_key == account_id
+
+
+def test_construct_without_io(account: Account, httpx_mock: HTTPXMock):
+    AsyncThingsClient(account)
+    assert not httpx_mock.get_requests()
+
+
+def test_shared_transport(account: Account, httpx_mock: HTTPXMock):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+
+    async def run() -> Transport:
+        async with Transport() as transport:
+            things = AsyncThingsClient(account, transport=transport)
+            async with things:
+                assert things._session.head_index == 123
+            assert not transport.closed
+        return transport
+
+    assert asyncio.run(run()).closed
+
+
+def test_update_connects_while_fetching(
+    account: Account,
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    store = MemoryStore()
+    store.offset = 1000
+    httpx_mock.add_response(
+        201,
+        url="https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(
+        200,
+        url=f"https://cloud.culturedcode.com/version/1/history/{account_id}/items?start-index=1000",
+        json=history_data_new,
+    )
+
+    async def run() -> AsyncThingsClient:
+        things = AsyncThingsClient(account, store=store)
+        await things.update()
+        await things.aclose()
+        return things
+
+    things = asyncio.run(run())
+    assert things._offset == 1234
+    assert things._session.head_index == 123
+
+
+def test_update(
+    account: Account, history_data_new: dict[str, Any], httpx_mock: HTTPXMock
+):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    httpx_mock.add_response(200, json=history_data_new)
+
+    async def run() -> None:
+        async with AsyncThingsClient(account) as things:
+            result = await things.update()
+            assert result.items == 1
+            assert things._offset == 1234
+            assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+
+    asyncio.run(run())
+    session_request, items_request = httpx_mock.get_requests()
+    assert session_request.url.path == "/api/account/login/getT3SharedSession"
+    assert items_request.url.params["start-index"] == "123"
+
+
+def test_update_fetch_ahead(
+    account: Account,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    first_page = {
+        **history_data_new,
+        "start-total-content-size": 100,
+        "end-total-content-size": 600,
+        "latest-total-content-size": 1000,
+    }
+    last_page = {
+        **history_data_edit,
+        "start-total-content-size": 600,
+        "end-total-content-size": 1000,
+        "latest-total-content-size": 1000,
+        "current-item-index": 125,
+    }
+    httpx_mock.add_response(200, json=first_page)
+    httpx_mock.add_response(200, json=last_page)
+
+    async def run() -> None:
+        async with AsyncThingsClient(account) as things:
+            result = await things.update(fetch_ahead=1)
+            assert result.pages == 2
+            assert things._offset == 125
+            item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+            assert item.title == "test updated"
+
+    asyncio.run(run())
+    starts = [
+        request.url.params.get("start-index") for request in httpx_mock.get_requests()
+    ]
+    assert starts == [None, "123", "124"]
+
+
+def test_update_fan_out(
+    account: Account,
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    new_body = history_data_new["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+
+    def page(items: list[dict[str, Any]], more: bool = True) -> dict[str, Any]:
+        return {
+            **history_data_new,
+            "items": items,
+            "current-item-index": 127,
+            "latest-total-content-size": 1000,
+            "end-total-content-size": 500 if more else 1000,
+        }
+
+    url = f"https://cloud.culturedcode.com/version/1/history/{account_id}/items"
+    pages = {
+        123: page([history_data_new["items"][0], {"b" * 22: new_body}]),
+        125: page([{"c" * 22: new_body}, history_data_edit["items"][0]]),
+        127: page([], more=False),
+    }
+    for start, data in pages.items():
+        httpx_mock.add_response(200, url=f"{url}?start-index={start}", json=data)
+
+    async def run() -> None:
+        async with AsyncThingsClient(account) as things:
+            result = await things.update(concurrency=2)
+            assert result.items == 4
+            assert things._offset == 127
+            item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+            assert item.title == "test updated"
+
+    asyncio.run(run())
+
+
+def test_update_decode_executor(
+    account: Account, history_data_new: dict[str, Any], httpx_mock: HTTPXMock
+):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    httpx_mock.add_response(200, json=history_data_new)
+
+    async def run() -> None:
+        with ThreadPoolExecutor() as executor:
+            async with AsyncThingsClient(account, decode_executor=executor) as things:
+                result = await things.update()
+                assert result.items == 1
+                assert things._offset == 1234
+                item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+                assert item.title == "test task"
+
+    asyncio.run(run())
+
+
+def test_commit(account: Account, account_id: uuid.UUID, httpx_mock: HTTPXMock):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    task = TodoItem(title="async task")
+
+    async def run() -> AsyncThingsClient:
+        things = AsyncThingsClient(account)
+        await things.commit(task)
+        await things.aclose()
+        return things
+
+    things = asyncio.run(run())
+    request = httpx_mock.get_requests()[-1]
+    assert (
+        request.url
+        == f"https://cloud.culturedcode.com/version/1/history/{account_id}/commit?ancestor-index=123&_cnt=1"
+    )
+    assert json.loads(request.content)[task.uuid]["p"]["tt"] == "async task"
+    assert things._offset == 124
+    assert task._synced_state
+    assert things._items[task.uuid] is task
+
+
+def test_write_behind_flush_on_close(account: Account, httpx_mock: HTTPXMock):
+    httpx_mock.add_response(
+        201, json={"headIndex": 123, "historyKeySessionSecret": "fake"}
+    )
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    task = TodoItem(title="queued")
+
+    async def run() -> AsyncThingsClient:
+        async with AsyncThingsClient(
+            account, write_behind=CommitQueue(max_items=10)
+        ) as things:
+            await things.commit(task)
+            assert len(httpx_mock.get_requests()) == 1  # the session
+        return things
+
+    things = asyncio.run(run())
+    assert not things._queue
+    assert things._offset == 124
+    assert task._synced_state
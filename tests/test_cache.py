@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Any
+
+import httpx
+import pytest
+from freezegun import freeze_time
+from pydantic import SecretStr
+from pytest_httpx import HTTPXMock
+
+from things_cloud.api.account import Account, Credentials
+from things_cloud.api.cache import SCRYPT_COST, FileSessionCache, SessionCache
+from things_cloud.api.client import ThingsClient
+from things_cloud.store import MemoryStore
+
+LOGIN_URL = "https://cloud.culturedcode.com/version/1/account/johndoe@example.com"
+SESSION_URL = "https://cloud.culturedcode.com/api/account/login/getT3SharedSession"
+
+
+@pytest.fixture()
+def credentials() -> Credentials:
+    return Credentials(email="johndoe@example.com", password=SecretStr("secret"))
+
+
+@pytest.fixture()
+def account_id() -> uuid.UUID:
+    return uuid.uuid4()
+
+
+@pytest.fixture()
+def login_data(account_id: uuid.UUID) -> dict[str, Any]:
+    return {
+        "SLA-version-accepted": "5",
+        "email": "johndoe@example.com",
+        "history-key": str(account_id),
+        "issues": [],
+        "maildrop-email": "maildrop-does-not-exist@things.email",
+        "status": "SYAccountStatusActive",
+    }
+
+
+@pytest.fixture()
+def store() -> MemoryStore:
+    store = MemoryStore()
+    store.offset = 1000
+    return store
+
+
+def test_file_cache(
+    credentials: Credentials,
+    login_data: dict[str, Any],
+    store: MemoryStore,
+    httpx_mock: HTTPXMock,
+    tmp_path,
+):
+    path = tmp_path / "sessions.json"
+    httpx_mock.add_response(200, url=LOGIN_URL, json=login_data)
+    httpx_mock.add_response(
+        201, url=SESSION_URL, json={"headIndex": 123, "historyKeySessionSecret": "x"}
+    )
+    account = Account.login(credentials, cache=FileSessionCache(path))
+    with ThingsClient(account, store=store):
+        pass
+    assert len(httpx_mock.get_requests()) == 2
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert "secret" not in path.read_text()
+    # the credentials are kept as a slow digest, not a single fast hash
+    entry = json.loads(path.read_text())[credentials.email]
+    assert entry["cost"] == SCRYPT_COST
+    payload = credentials.as_encoded_payload().encode()
+    salt = bytes.fromhex(entry["salt"])
+    assert entry["digest"] != hashlib.sha256(salt + payload).hexdigest()
+
+    # a restarted worker neither logs in nor starts a session
+    account = Account.login(credentials, cache=FileSessionCache(path))
+    things = ThingsClient(account, store=store)
+    things.connect()
+    assert len(httpx_mock.get_requests()) == 2
+    assert account.history_key == login_data["history-key"]
+    assert things._session.head_index == 123
+    assert things._offset == 1000
+    things.close()
+
+    # entries with a fast digest of an earlier version are ignored
+    entries = json.loads(path.read_text())
+    del entries[credentials.email]["cost"]
+    path.write_text(json.dumps(entries))
+    assert FileSessionCache(path).info(credentials) is None
+
+
+def test_cache_validity(
+    credentials: Credentials, login_data: dict[str, Any], httpx_mock: HTTPXMock
+):
+    cache = SessionCache(max_age=60)
+    httpx_mock.add_response(200, url=LOGIN_URL, json=login_data)
+    with freeze_time() as frozen:
+        Account.login(credentials, cache=cache)
+        assert cache.info(credentials) is not None
+        other = Credentials(email=credentials.email, password=SecretStr("changed"))
+        assert cache.info(other) is None
+        frozen.tick(61)
+        assert cache.info(credentials) is None
+
+
+def test_fresh_store_starts_session(
+    credentials: Credentials, login_data: dict[str, Any], httpx_mock: HTTPXMock
+):
+    cache = SessionCache()
+    httpx_mock.add_response(200, url=LOGIN_URL, json=login_data)
+    httpx_mock.add_response(
+        201,
+        url=SESSION_URL,
+        json={"headIndex": 123, "historyKeySessionSecret": "x"},
+        is_reusable=True,
+    )
+    account = Account.login(credentials, cache=cache)
+    with ThingsClient(account):
+        pass
+    # the cached head index is outdated for a store without items
+    with ThingsClient(account):
+        pass
+    assert len(httpx_mock.get_requests(url=SESSION_URL)) == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_relogin_on_auth_failure(
+    stream: bool,
+    credentials: Credentials,
+    login_data: dict[str, Any],
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    store: MemoryStore,
+    httpx_mock: HTTPXMock,
+):
+    cache = SessionCache()
+    httpx_mock.add_response(200, url=LOGIN_URL, json=login_data)
+    httpx_mock.add_response(
+        201, url=SESSION_URL, json={"headIndex": 123, "historyKeySessionSecret": "x"}
+    )
+    account = Account.login(credentials, cache=cache)
+    things = ThingsClient(account, store=store)
+    things.connect()
+
+    history_url = (
+        "https://cloud.culturedcode.com/version/1/history/{}/items?start-index=1000"
+    )
+    new_key = uuid.uuid4()
+    httpx_mock.add_response(401, url=history_url.format(account_id))
+    httpx_mock.add_response(
+        200, url=LOGIN_URL, json={**login_data, "history-key": str(new_key)}
+    )
+    httpx_mock.add_response(
+        201, url=SESSION_URL, json={"headIndex": 2000, "historyKeySessionSecret": "y"}
+    )
+    httpx_mock.add_response(200, url=history_url.format(new_key), json=history_data_new)
+    things.update(stream=stream)
+    assert len(httpx_mock.get_requests(url=LOGIN_URL)) == 2
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+    # the request is sent again to the history of the new login, with a new session
+    assert account.history_key == str(new_key)
+    assert things._session.history_key_session_secret == "y"
+    assert things._offset == 1234
+    session = cache.session(credentials)
+    assert session is not None
+    assert session.history_key_session_secret == "y"
+    things.close()
+
+
+def test_relogin_once_for_concurrent_requests(
+    credentials: Credentials,
+    login_data: dict[str, Any],
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    store: MemoryStore,
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.add_response(200, url=LOGIN_URL, json=login_data)
+    httpx_mock.add_response(
+        201, url=SESSION_URL, json={"headIndex": 123, "historyKeySessionSecret": "x"}
+    )
+    account = Account.login(credentials, cache=SessionCache())
+    things = ThingsClient(account, store=store)
+    things.connect()
+
+    history_url = "https://cloud.culturedcode.com/version/1/history/{}/items"
+    new_key = uuid.uuid4()
+    body = history_data_new["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+
+    def page(title: str, more: bool = True) -> dict[str, Any]:
+        return {
+            **history_data_new,
+            "items": [{title * 22: {**body, "p": {**body["p"], "tt": title}}}],
+            "current-item-index": 1003,
+            "latest-total-content-size": 1000,
+            "end-total-content-size": 500 if more else 1000,
+        }
+
+    httpx_mock.add_response(
+        200, url=f"{history_url.format(account_id)}?start-index=1000", json=page("a")
+    )
+    # both fan-out workers are rejected by the stale login
+    rejected = threading.Barrier(2)
+
+    def reject(request: httpx.Request) -> httpx.Response:
+        rejected.wait(timeout=5)
+        return httpx.Response(401)
+
+    for start in (1001, 1002):
+        httpx_mock.add_callback(
+            reject, url=f"{history_url.format(account_id)}?start-index={start}"
+        )
+    httpx_mock.add_response(
+        200,
+        url=LOGIN_URL,
+        json={**login_data, "history-key": str(new_key)},
+        is_optional=True,
+        is_reusable=True,
+    )
+    httpx_mock.add_response(
+        201,
+        url=SESSION_URL,
+        json={"headIndex": 2000, "historyKeySessionSecret": "y"},
+        is_optional=True,
+        is_reusable=True,
+    )
+    new_url = history_url.format(new_key)
+    httpx_mock.add_response(200, url=f"{new_url}?start-index=1001", json=page("b"))
+    httpx_mock.add_response(200, url=f"{new_url}?start-index=1002", json=page("c"))
+    httpx_mock.add_response(
+        200, url=f"{new_url}?start-index=1003", json=page("d", more=False)
+    )
+    things.update(concurrency=2)
+    assert len(httpx_mock.get_requests(url=LOGIN_URL)) == 2
+    assert len(httpx_mock.get_requests(url=SESSION_URL)) == 2
+    assert sorted(things._items) == [title * 22 for title in "abcd"]
+    things.close()
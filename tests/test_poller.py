@@ -0,0 +1,162 @@
+import asyncio
+import re
+import time
+import uuid
+from typing import Any
+
+import pytest
+from pydantic import SecretStr
+from pytest_httpx import HTTPXMock
+
+from things_cloud import AsyncThingsClient, ThingsClient
+from things_cloud.api.account import Account, AccountInfo, Credentials
+from things_cloud.api.poller import AsyncPoller, Backoff, Poller
+from things_cloud.models.todo import TodoItem
+from things_cloud.store import MemoryStore, SQLiteStore
+
+AT_HEAD = {
+    "items": [],
+    "current-item-index": 123,
+    "schema": 301,
+    "start-total-content-size": 1000,
+    "end-total-content-size": 1000,
+    "latest-total-content-size": 1000,
+}
+
+
+@pytest.fixture()
+def account() -> Account:
+    credentials = Credentials(
+        email="johndoe@example.com", password=SecretStr("example_f0$'@")
+    )
+    info = AccountInfo.model_validate(
+        {
+            "SLA-version-accepted": "5",
+            "email": "johndoe@example.com",
+            "history-key": str(uuid.uuid4()),
+            "issues": [],
+            "maildrop-email": "maildrop-does-not-exist@things.email",
+            "status": "SYAccountStatusActive",
+        }
+    )
+    return Account(_credentials=credentials, _info=info)
+
+
+@pytest.fixture()
+def store() -> MemoryStore:
+    store = MemoryStore()
+    store.offset = 123
+    return store
+
+
+@pytest.fixture()
+def server(httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(
+        201,
+        url="https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+        is_reusable=True,
+    )
+    httpx_mock.add_response(
+        200, url=re.compile(r".*/items\?.*"), json=AT_HEAD, is_reusable=True
+    )
+    httpx_mock.add_response(
+        200,
+        url=re.compile(r".*/commit\?.*"),
+        json={"server-head-index": 124},
+        is_optional=True,
+    )
+
+
+def test_backoff():
+    backoff = Backoff(min_interval=1, max_interval=5, factor=2)
+    backoff.unchanged()
+    backoff.unchanged()
+    assert backoff.interval == 4
+    backoff.unchanged()
+    assert backoff.interval == 5
+    backoff.changed()
+    assert backoff.interval == 1
+    with pytest.raises(ValueError, match="max_interval"):
+        Backoff(min_interval=2, max_interval=1)
+
+
+@pytest.mark.usefixtures("server")
+def test_poller(account: Account, store: MemoryStore):
+    things = ThingsClient(account, store=store)
+    backoff = Backoff(min_interval=0.01, max_interval=0.04)
+    with Poller(things, backoff) as poller:
+        deadline = time.monotonic() + 5
+        while poller.stats.polls < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert not poller.running
+    stats = poller.stats
+    assert stats.polls >= 4
+    assert stats.empty_polls == stats.polls
+    assert stats.last_change_at is None
+    assert stats.lag_items == 0
+    assert stats.staleness is not None
+    assert backoff.interval == 0.04
+
+    # a local commit speeds up polling again
+    poller.commit(TodoItem(title="local"))
+    assert backoff.interval == 0.01
+    assert things._offset == 124
+
+
+def test_poller_sqlite_store(
+    account: Account, history_data_new: dict[str, Any], httpx_mock: HTTPXMock, tmp_path
+):
+    httpx_mock.add_response(
+        201,
+        url="https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(
+        200, url=re.compile(r".*/items\?start-index=123$"), json=history_data_new
+    )
+    httpx_mock.add_response(
+        200,
+        url=re.compile(r".*/items\?start-index=1234$"),
+        json={**AT_HEAD, "current-item-index": 1234},
+        is_reusable=True,
+    )
+    path = tmp_path / "things.db"
+    store = SQLiteStore(path)
+    store.offset = 123
+    things = ThingsClient(account, store=store)
+    # the poller thread flushes the store opened by this one
+    with Poller(things, Backoff(min_interval=0.01, max_interval=0.04)) as poller:
+        deadline = time.monotonic() + 5
+        while poller.stats.polls < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert poller.stats.errors == 0, poller.stats.last_error
+    assert poller.stats.last_change_at is not None
+    things.close()
+    store.close()
+
+    with SQLiteStore(path) as store:
+        assert store.offset == 1234
+        assert store["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+
+
+@pytest.mark.usefixtures("server")
+def test_async_poller(account: Account, store: MemoryStore):
+    async def run() -> AsyncPoller:
+        things = AsyncThingsClient(account, store=store)
+        backoff = Backoff(min_interval=0.01, max_interval=0.04)
+        async with AsyncPoller(things, backoff) as poller:
+            with pytest.raises(RuntimeError, match="already running"):
+                poller.start()
+            while poller.stats.polls < 4:
+                await asyncio.sleep(0.01)
+        assert not poller.running
+        assert backoff.interval == 0.04
+        await poller.commit(TodoItem(title="local"))
+        assert backoff.interval == 0.01
+        await things.aclose()
+        return poller
+
+    poller = asyncio.run(asyncio.wait_for(run(), 5))
+    assert poller.stats.empty_polls == poller.stats.polls
+    assert poller.stats.errors == 0
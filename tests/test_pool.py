@@ -0,0 +1,115 @@
+import asyncio
+import re
+import uuid
+from typing import Any
+
+import httpx
+import pytest
+from freezegun import freeze_time
+from pydantic import SecretStr
+from pytest_httpx import HTTPXMock
+
+from things_cloud.api.account import Account, AccountInfo, Credentials
+from things_cloud.api.exceptions import ThingsCloudException
+from things_cloud.api.pool import ThingsClientPool
+
+SESSION_URL = "https://cloud.culturedcode.com/api/account/login/getT3SharedSession"
+
+
+def make_account() -> Account:
+    credentials = Credentials(
+        email="johndoe@example.com", password=SecretStr("example_f0$'@")
+    )
+    info = AccountInfo.model_validate(
+        {
+            "SLA-version-accepted": "5",
+            "email": "johndoe@example.com",
+            "history-key": str(uuid.uuid4()),
+            "issues": [],
+            "maildrop-email": "maildrop-does-not-exist@things.email",
+            "status": "SYAccountStatusActive",
+        }
+    )
+    return Account(_credentials=credentials, _info=info)
+
+
+def items_url(account: Account) -> str:
+    history_key = account._info.history_key
+    return f"https://cloud.culturedcode.com/version/1/history/{history_key}/items?start-index=123"
+
+
+@pytest.fixture()
+def session(httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(
+        201,
+        url=SESSION_URL,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+        is_reusable=True,
+    )
+
+
+@pytest.mark.usefixtures("session")
+def test_update_all(history_data_new: dict[str, Any], httpx_mock: HTTPXMock):
+    first, second = make_account(), make_account()
+    httpx_mock.add_response(200, url=items_url(first), json=history_data_new)
+    httpx_mock.add_response(500, url=items_url(second))
+
+    async def run() -> None:
+        async with ThingsClientPool() as pool:
+            pool.add(first)
+            pool.add(second)
+            with pytest.raises(ValueError, match="already added"):
+                pool.add(first)
+            with freeze_time() as frozen:
+                results = await pool.update_all()
+                frozen.tick(30)
+                assert pool.lag() == {
+                    first.history_key: 30,
+                    second.history_key: None,
+                }
+            result = results[first.history_key]
+            assert not isinstance(result, Exception)
+            assert result.items == 1
+            assert result.lag == 0
+            assert pool.status(first).lag_items == 0
+            assert isinstance(results[second.history_key], Exception)
+            assert isinstance(pool.status(second).error, ThingsCloudException)
+            item = pool.client(first)._items["aBCDiHyah4Uf0MQqp11jsX"]
+            assert item.title == "test task"
+
+    asyncio.run(run())
+
+
+@pytest.mark.usefixtures("session")
+def test_concurrency_limit(history_data_new: dict[str, Any], httpx_mock: HTTPXMock):
+    running = 0
+    most = 0
+
+    async def page(request: httpx.Request) -> httpx.Response:
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return httpx.Response(200, json=history_data_new)
+
+    httpx_mock.add_callback(page, url=re.compile(r".*/items\?.*"), is_reusable=True)
+
+    async def run() -> None:
+        async with ThingsClientPool(max_concurrency=2) as pool:
+            accounts = [make_account() for _ in range(5)]
+            for account in accounts:
+                pool.add(account)
+            results = await pool.update_all()
+            items = [
+                result.items
+                for result in results.values()
+                if not isinstance(result, Exception)
+            ]
+            assert items == [1] * 5
+            assert len(pool) == 5
+            await pool.remove(accounts[0])
+            assert accounts[0] not in pool
+
+    asyncio.run(run())
+    assert most == 2
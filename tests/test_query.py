@@ -0,0 +1,86 @@
+import pytest
+
+from things_cloud.models.todo import Status, TodoItem
+from things_cloud.store import MemoryStore, Query
+
+
+@pytest.fixture()
+def store() -> MemoryStore:
+    store = MemoryStore()
+    project = TodoItem(title="project", index=0, today_index=11).as_project()
+    project._uuid = "project"
+    store[project.uuid] = project
+    for i in range(10):
+        task = TodoItem(title=f"task {i}", index=i + 1, today_index=10 - i)
+        task._uuid = f"task-{i}"
+        if i % 2:
+            task.project = project
+        if i % 3 == 0:
+            task.complete()
+        store[task.uuid] = task
+    return store
+
+
+def titles(query: Query) -> list[str]:
+    return [item.title for item in query.all()]
+
+
+def test_where_indexed(store: MemoryStore):
+    query = store.query().where(project="project", status=Status.COMPLETE)
+    assert titles(query) == ["task 3", "task 9"]
+    assert query.count() == 2
+
+
+def test_plan_picks_most_selective_index(store: MemoryStore):
+    query = store.query().where(status=Status.TODO, project="project")
+    assert query.plan() == ("project", "project")
+    query = store.query().where(status=Status.COMPLETE, project="project")
+    assert query.plan() == ("status", Status.COMPLETE)
+    assert store.query().where(title="task 1").plan() is None
+
+
+def test_where_none(store: MemoryStore):
+    query = store.query().where(project=None, status=Status.COMPLETE)
+    assert query.plan() == ("status", Status.COMPLETE)
+    assert titles(query) == ["task 0", "task 6"]
+    assert store.query().where(scheduled_date=None).count() == 11
+    assert store.query().where(due_date=None, tag=None).count() == 11
+    assert store.query().where(status=None).count() == 0
+
+
+def test_where_scan(store: MemoryStore):
+    assert titles(store.query().where(title="task 4")) == ["task 4"]
+
+
+def test_filter(store: MemoryStore):
+    query = store.query().where(project="project").filter(lambda item: item.index > 6)
+    assert titles(query) == ["task 7", "task 9"]
+
+
+def test_order_and_page(store: MemoryStore):
+    query = store.query().where(status=Status.TODO).order_by("today_index")
+    assert titles(query) == [
+        "task 8",
+        "task 7",
+        "task 5",
+        "task 4",
+        "task 2",
+        "task 1",
+        "project",
+    ]
+    assert titles(query.offset(1).limit(2)) == ["task 7", "task 5"]
+    assert titles(query.order_by("index", descending=True).limit(2)) == [
+        "task 8",
+        "task 7",
+    ]
+    assert titles(query.offset(5)) == ["task 1", "project"]
+    first = query.first()
+    assert first
+    assert first.title == "task 8"
+    assert store.query().where(title="missing").first() is None
+
+
+def test_stale_index_is_verified(store: MemoryStore):
+    # modified in place without storing it again
+    store["task-1"].project = None
+    assert "task 1" not in titles(store.query().where(project="project"))
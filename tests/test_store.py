@@ -0,0 +1,281 @@
+import pickle
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from things_cloud.models.todo import (
+    Destination,
+    Status,
+    TodoDeltaApiObject,
+    TodoItem,
+    Type,
+)
+from things_cloud.store import (
+    CompactStore,
+    ItemStore,
+    LazyStore,
+    MemoryStore,
+    SQLiteStore,
+    load_snapshot,
+    save_snapshot,
+)
+from things_cloud.store.snapshot import HEADER, MAGIC, VERSION
+
+
+@pytest.fixture()
+def synced_item() -> TodoItem:
+    item = TodoItem(title="synced task")
+    item._commit(item._to_new())
+    return item
+
+
+@pytest.fixture()
+def db_path(tmp_path: Path) -> Path:
+    return tmp_path / "things.db"
+
+
+@pytest.fixture(params=[MemoryStore, lambda: SQLiteStore(":memory:")])
+def store(request: pytest.FixtureRequest) -> Iterator[ItemStore]:
+    with request.param() as store:
+        yield store
+
+
+def test_mapping(store: ItemStore, synced_item: TodoItem):
+    assert store.offset is None
+    assert len(store) == 0
+    store[synced_item.uuid] = synced_item
+    assert store[synced_item.uuid] is synced_item
+    assert list(store) == [synced_item.uuid]
+    del store[synced_item.uuid]
+    assert synced_item.uuid not in store
+
+
+def test_sqlite_persist(db_path: Path, synced_item: TodoItem):
+    project = TodoItem(title="project").as_project()
+    synced_item.title = "local change"
+    synced_item.project = project
+    synced_item.complete()
+    with SQLiteStore(db_path) as store:
+        store[synced_item.uuid] = synced_item
+        store[project.uuid] = project
+        store.offset = 42
+
+    with SQLiteStore(db_path) as store:
+        assert store.offset == 42
+        assert len(store) == 2
+        item = store[synced_item.uuid]
+        assert item.uuid == synced_item.uuid
+        assert item.title == "local change"
+        assert item.status is Status.COMPLETE
+        assert item.project == project.uuid
+        assert item.destination is Destination.ANYTIME
+        assert item._synced_state == synced_item._synced_state
+        # local changes are still pending against the synced baseline
+        assert item._to_edit().title == "local change"
+        loaded_project = store[project.uuid]
+        assert loaded_project.type is Type.PROJECT
+        assert loaded_project._synced_state is None
+
+
+def test_sqlite_delete(db_path: Path, synced_item: TodoItem):
+    with SQLiteStore(db_path) as store:
+        store[synced_item.uuid] = synced_item
+    with SQLiteStore(db_path) as store:
+        del store[synced_item.uuid]
+    with SQLiteStore(db_path) as store:
+        assert len(store) == 0
+
+
+def test_sqlite_unflushed_changes_are_discarded(db_path: Path, synced_item: TodoItem):
+    store = SQLiteStore(db_path)
+    store.offset = 1
+    store.flush()
+    store[synced_item.uuid] = synced_item
+    store.offset = 2
+    store._conn.close()  # simulate crash before flush
+
+    with SQLiteStore(db_path) as store:
+        assert store.offset == 1
+        assert len(store) == 0
+
+
+def test_index(store: ItemStore):
+    project = TodoItem(title="project").as_project()
+    task = TodoItem(title="task", tags=["tag-a", "tag-b"])
+    task.project = project
+    task.today()
+    store[project.uuid] = project
+    store[task.uuid] = task
+
+    today = task.scheduled_date
+    assert today
+    assert store.find("scheduled_date", today.date()) == [task]
+    assert store.find("project", project.uuid) == [task]
+    assert store.find("type", Type.PROJECT) == [project]
+    assert store.find("tag", "tag-b") == [task]
+    assert {item.uuid for item in store.find("status", Status.TODO)} == {
+        project.uuid,
+        task.uuid,
+    }
+
+    # changes are picked up when the item is stored again
+    task.complete()
+    task.area = "area"
+    store[task.uuid] = task
+    assert store.find("status", Status.TODO) == [project]
+    assert store.find("status", Status.COMPLETE) == [task]
+    assert store.find("project", project.uuid) == []
+    assert store.find("area", "area") == [task]
+    assert store.index.values("project") == []
+
+    del store[task.uuid]
+    assert store.find("area", "area") == []
+    assert store.find("tag", "tag-a") == []
+    # key tuples shared between items are dropped once no item uses them
+    assert ("tag-a", "tag-b") not in store.index._shared_keys
+    del store[project.uuid]
+    assert not store.index._shared_keys
+
+
+def test_index_unknown(store: ItemStore):
+    with pytest.raises(ValueError, match="unknown index"):
+        store.find("unknown", 1)
+
+
+def test_sqlite_index_loaded(db_path: Path, synced_item: TodoItem):
+    synced_item.trashed = True
+    with SQLiteStore(db_path) as store:
+        store[synced_item.uuid] = synced_item
+    with SQLiteStore(db_path) as store:
+        assert [item.uuid for item in store.find("trashed", True)] == [synced_item.uuid]
+
+
+def test_snapshot(tmp_path: Path, synced_item: TodoItem):
+    path = tmp_path / "things.snapshot"
+    synced_item.title = "local change"
+    synced_item.today()
+    new_item = TodoItem(title="new", tags=["tag"])
+    save_snapshot(path, "history-key", 42, [synced_item, new_item])
+
+    snapshot = load_snapshot(path)
+    assert snapshot.history_key == "history-key"
+    assert snapshot.offset == 42
+    loaded, loaded_new = snapshot.items
+    assert loaded == synced_item
+    assert loaded.uuid == synced_item.uuid
+    assert loaded.destination is Destination.ANYTIME
+    assert loaded._synced_state == synced_item._synced_state
+    assert loaded._to_edit().title == "local change"
+    assert loaded_new.uuid == new_item.uuid
+    assert loaded_new.tags == ["tag"]
+    assert loaded_new._synced_state is None
+
+
+def test_snapshot_old_version(tmp_path: Path):
+    path = tmp_path / "things.snapshot"
+    with path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION - 1, 1))
+        pickle.dump(("history-key", []), f)
+    with pytest.raises(ValueError, match=f"unsupported snapshot version {VERSION - 1}"):
+        load_snapshot(path)
+
+
+def test_snapshot_pickled_state():
+    # the private state of an item is pickled, bump VERSION when it changes
+    assert set(TodoItem.__private_attributes__) == {
+        "_uuid",
+        "_status",
+        "_destination",
+        "_projects",
+        "_areas",
+        "_evening",
+        "_type",
+        "_baseline",
+        "_batch",
+    }
+    assert VERSION == 4
+
+
+def test_snapshot_invalid(tmp_path: Path):
+    path = tmp_path / "things.snapshot"
+    path.write_bytes(b"garbage")
+    with pytest.raises(ValueError, match="not a snapshot file"):
+        load_snapshot(path)
+
+
+def test_snapshot_rejects_unknown_objects(tmp_path: Path):
+    path = tmp_path / "things.snapshot"
+    with path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 1))
+        pickle.dump(("history-key", [Path("/")]), f)
+    with pytest.raises(pickle.UnpicklingError, match="unexpected object"):
+        load_snapshot(path)
+
+
+def test_sqlite_persist_uncommitted_edit(db_path: Path, synced_item: TodoItem):
+    synced_item.title = "local change"
+    with SQLiteStore(db_path) as store:
+        store[synced_item.uuid] = synced_item
+
+    with SQLiteStore(db_path) as store:
+        delta = store[synced_item.uuid]._to_edit()
+        assert delta.title == "local change"
+
+
+def test_compact_store(synced_item: TodoItem):
+    synced_item.tags = ["tag"]
+    synced_item.today()
+    other = TodoItem(title="other")
+    store = CompactStore()
+    store[synced_item.uuid] = synced_item
+    store[other.uuid] = other
+
+    view = store.view(synced_item.uuid)
+    assert view.title == "synced task"
+    assert view.tags == ("tag",)
+    assert view.note is store.view(other.uuid).note
+    assert [item.uuid for item in store.find("tag", "tag")] == [synced_item.uuid]
+    assert {view.uuid for view in store.views()} == {synced_item.uuid, other.uuid}
+
+    # items are built on access, with the stored state as synced state
+    item = store[synced_item.uuid]
+    assert item is not synced_item
+    assert item.model_dump() == synced_item.model_dump()
+    assert item._synced_state
+    assert item._synced_state.tags == ["tag"]
+    item.tags.append("other")
+    item.note.value = "note"
+    assert store.view(synced_item.uuid).tags == ("tag",)
+    assert store.view(other.uuid).note.value == ""
+
+    item.title = "edited"
+    assert item._to_edit().title == "edited"
+    store[item.uuid] = item
+    assert store.view(item.uuid).title == "edited"
+    assert store.query().where(tag="other").first() == store[item.uuid]
+
+
+def test_lazy_store(synced_item: TodoItem):
+    payload = synced_item._to_api_object()
+    store = LazyStore()
+    store.add_payload(synced_item.uuid, payload)
+    store.apply_delta(
+        synced_item.uuid, TodoDeltaApiObject(title="edited", trashed=True)
+    )
+    # edits are written into the payload until the item is read
+    assert payload.title == "edited"
+    assert store.index.get("trashed", True) == {synced_item.uuid}
+    assert len(store) == 1
+
+    items = list(store.values())
+    item = store[synced_item.uuid]
+    assert items == [item]
+    assert item.title == "edited"
+    assert item._synced_state == payload
+    store.apply_delta(item.uuid, TodoDeltaApiObject(title="edited again"))
+    assert store[item.uuid] is item
+    assert item.title == "edited again"
+
+    with pytest.raises(KeyError):
+        store.apply_delta("unknown", TodoDeltaApiObject(title="edited"))
@@ -0,0 +1,117 @@
+import json
+from typing import Any
+
+import pytest
+
+from things_cloud.api.stream import HistoryStream
+from things_cloud.models.todo import EditBody, NewBody
+
+META = {
+    "current-item-index": 1234,
+    "schema": 301,
+    "start-total-content-size": 1,
+    "end-total-content-size": 1234567,
+    "latest-total-content-size": 1234567,
+}
+
+NEW_ITEM = {
+    "aBCDiHyah4Uf0MQqp11jsX": {
+        "p": {
+            "ix": 1234,
+            "cd": 1641234567,
+            "icsd": None,
+            "ar": [],
+            "tir": None,
+            "rmd": None,
+            "pr": [],
+            "rp": None,
+            "rr": None,
+            "dds": None,
+            "tt": "test task ✓",
+            "tr": False,
+            "tp": 0,
+            "lt": False,
+            "acrd": None,
+            "ti": 0,
+            "tg": [],
+            "icp": False,
+            "nt": {"ch": 0, "_t": "tx", "t": 1, "v": ""},
+            "do": 0,
+            "dl": [],
+            "lai": None,
+            "dd": None,
+            "rt": [],
+            "md": 1641234567.5,
+            "ss": 0,
+            "sr": None,
+            "sp": None,
+            "st": 1,
+            "icc": 0,
+            "ato": None,
+            "sb": 0,
+            "agr": [],
+            "xx": {"sn": {}, "_t": "oo"},
+        },
+        "e": "Task6",
+        "t": 0,
+    }
+}
+
+EDIT_ITEM = {
+    "aBCDiHyah4Uf0MQqp11jsX": {
+        "p": {"md": 1641234567.123456, "tt": "test updated"},
+        "e": "Task6",
+        "t": 1,
+    }
+}
+
+
+def chunked(data: dict[str, Any], size: int) -> list[bytes]:
+    raw = json.dumps(data, indent=1, ensure_ascii=False).encode("utf-8")
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+@pytest.mark.parametrize("items_first", [True, False])
+def test_stream(chunk_size: int, items_first: bool):
+    items = {"items": [NEW_ITEM, EDIT_ITEM]}
+    data = {**items, **META} if items_first else {**META, **items}
+    stream = HistoryStream(chunked(data, chunk_size))
+    updates = list(stream)
+    assert len(updates) == 2
+    assert isinstance(updates[0].body, NewBody)
+    assert updates[0].body.payload.title == "test task ✓"
+    assert isinstance(updates[1].body, EditBody)
+    assert updates[1].body.payload.title == "test updated"
+    assert stream.item_count == 2
+    assert stream.page
+    assert stream.page.current_item_index == 1234
+    assert stream.page.latest_total_content_size == 1234567
+
+
+def test_stream_yields_before_end():
+    chunks = chunked({"items": [NEW_ITEM, EDIT_ITEM], **META}, 16)
+    consumed = 0
+
+    def source():
+        nonlocal consumed
+        for chunk in chunks:
+            consumed += 1
+            yield chunk
+
+    update = next(iter(HistoryStream(source())))
+    assert update.id == "aBCDiHyah4Uf0MQqp11jsX"
+    assert consumed < len(chunks)
+
+
+def test_stream_empty():
+    stream = HistoryStream(chunked({"items": [], **META}, 5))
+    assert list(stream) == []
+    assert stream.item_count == 0
+    assert stream.page
+
+
+def test_stream_truncated():
+    chunks = chunked({"items": [NEW_ITEM, EDIT_ITEM], **META}, 64)
+    with pytest.raises(ValueError):
+        list(HistoryStream(chunks[:-3]))
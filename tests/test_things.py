@@ -1,15 +1,23 @@
 import json
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import UTC, datetime
 from typing import Any
 
+import httpx
+import pydantic
 import pytest
 from freezegun import freeze_time
 from pydantic import SecretStr
 from pytest_httpx import HTTPXMock
+from structlog.testing import capture_logs
 
 from things_cloud.api.account import Account, Credentials
+from things_cloud.api.checkpoint import Checkpoint
 from things_cloud.api.client import HistoryResponse, ThingsClient
+from things_cloud.api.exceptions import ThingsCloudException
+from things_cloud.api.queue import CommitQueue
+from things_cloud.api.transport import Transport
 from things_cloud.models.todo import (
     XX,
     Destination,
@@ -17,9 +25,11 @@ from things_cloud.models.todo import (
     NewBody,
     Note,
     Status,
+    TodoApiObject,
     TodoItem,
     Type,
 )
+from things_cloud.store import LazyStore, MemoryStore, SQLiteStore
 
 
 @pytest.fixture()
@@ -73,6 +83,8 @@ def things(account: Account, httpx_mock: HTTPXMock) -> ThingsClient:
         json={"headIndex": 123, "historyKeySessionSecret": "fake"},
     )
     things = ThingsClient(account)
+    assert not httpx_mock.get_requests()
+    things.connect()
     request = httpx_mock.get_request()
     assert request
     assert request.method == "POST"
@@ -92,6 +104,44 @@ def test_client_session(things: ThingsClient):
     assert things._session.history_key_session_secret == "fake"
 
 
+def test_shared_transport(account: Account, httpx_mock: HTTPXMock):
+    httpx_mock.reset()
+    session = {"headIndex": 123, "historyKeySessionSecret": "fake"}
+    httpx_mock.add_response(201, json=session)
+    httpx_mock.add_response(201, json=session)
+    with Transport() as transport:
+        account._transport = transport
+        with ThingsClient(account) as first, ThingsClient(account) as second:
+            assert first._transport is second._transport is transport
+            assert first._client._transport._pool is transport._pool  # pyright: ignore[reportAttributeAccessIssue]
+        # closing the clients keeps the pool open for other clients
+        assert not transport.closed
+    assert transport.closed
+    with pytest.raises(RuntimeError, match="closed"):
+        transport.client()
+
+
+def test_owned_transport(things: ThingsClient):
+    assert things._owns_transport
+    things.close()
+    assert things._transport.closed
+
+
+def test_transport_environment_proxy(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.example:3128")
+    monkeypatch.setenv("NO_PROXY", "localhost,.internal.example")
+    url = httpx.URL("https://cloud.culturedcode.com/version/1/history")
+    with Transport() as transport, transport.client() as client:
+        proxied = client._transport_for_url(url)
+        assert proxied._pool is transport._proxy_pools["https://"]  # pyright: ignore[reportAttributeAccessIssue]
+        direct = client._transport_for_url(httpx.URL("https://api.internal.example"))
+        assert direct._pool is transport._pool  # pyright: ignore[reportAttributeAccessIssue]
+    with Transport(trust_env=False) as transport, transport.client() as client:
+        assert client._transport_for_url(url)._pool is transport._pool  # pyright: ignore[reportAttributeAccessIssue]
+    with Transport(proxy="http://other.example:8080") as transport:
+        assert list(transport._proxy_pools) == ["all://"]
+
+
 @pytest.fixture()
 @freeze_time(datetime(2024, 12, 9, 12, 31, 46, 919961, tzinfo=UTC))
 def task() -> TodoItem:
@@ -211,61 +261,6 @@ def test_update(
     assert things._offset == start_idx + 1
 
 
-@pytest.fixture()
-def history_data_new() -> dict[str, Any]:
-    return {
-        "items": [
-            {
-                "aBCDiHyah4Uf0MQqp11jsX": {
-                    "p": {
-                        "ix": 1234,
-                        "cd": 1641234567,
-                        "icsd": None,
-                        "ar": [],
-                        "tir": None,
-                        "rmd": None,
-                        "pr": ["ABCd1ee0ykmXYZqT98huxa"],
-                        "rp": None,
-                        "rr": None,
-                        "dds": None,
-                        "tt": "test task",
-                        "tr": False,
-                        "tp": 0,
-                        "lt": False,
-                        "acrd": None,
-                        "ti": 0,
-                        "tg": [],
-                        "icp": False,
-                        "nt": {"ch": 0, "_t": "tx", "t": 1, "v": ""},
-                        "do": 0,
-                        "dl": [],
-                        "lai": None,
-                        "dd": None,
-                        "rt": [],
-                        "md": 1641234567,
-                        "ss": 0,
-                        "sr": None,
-                        "sp": None,
-                        "st": 1,
-                        "icc": 0,
-                        "ato": None,
-                        "sb": 0,
-                        "agr": [],
-                        "xx": {"sn": {}, "_t": "oo"},
-                    },
-                    "e": "Task6",
-                    "t": 0,
-                }
-            }
-        ],
-        "current-item-index": 1234,
-        "schema": 301,
-        "start-total-content-size": 1,  # fake
-        "end-total-content-size": 1234567,
-        "latest-total-content-size": 1234567,
-    }
-
-
 @pytest.fixture()
 def history_new(history_data_new: dict[str, Any]) -> HistoryResponse:
     return HistoryResponse.model_validate(history_data_new)
@@ -325,26 +320,6 @@ def test_history_new(things: ThingsClient, history_new: HistoryResponse):
     # assert not todo._changes
 
 
-@pytest.fixture()
-def history_data_edit() -> dict[str, Any]:
-    return {
-        "items": [
-            {
-                "aBCDiHyah4Uf0MQqp11jsX": {
-                    "p": {"md": 1641234567.123456, "tt": "test updated"},
-                    "e": "Task6",
-                    "t": 1,
-                }
-            }
-        ],
-        "current-item-index": 1234,
-        "schema": 301,
-        "start-total-content-size": 1,
-        "end-total-content-size": 1234567,
-        "latest-total-content-size": 1234567,
-    }
-
-
 @pytest.fixture()
 def history_edit(history_data_edit: dict[str, Any]) -> HistoryResponse:
     return HistoryResponse.model_validate(history_data_edit)
@@ -503,3 +478,746 @@ def test_history_mixed(things: ThingsClient, history_mixed: HistoryResponse):
     todo3 = todos[UUID3]
     assert todo3.uuid == UUID3
     assert todo3.title == "task 3"
+
+
+def test_store_resume(
+    account: Account,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+    tmp_path,
+):
+    db_path = tmp_path / "things.db"
+    httpx_mock.reset()
+    httpx_mock.add_response(
+        201,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(200, json=history_data_new)
+    things = ThingsClient(account, store=SQLiteStore(db_path))
+    things.update()
+    assert things._offset == 1234
+    things._items.close()
+
+    httpx_mock.reset()
+    things = ThingsClient(account, store=SQLiteStore(db_path))
+    assert things._offset == 1234
+    assert not httpx_mock.get_requests()
+    item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+    assert item.title == "test task"
+    assert item._synced_state
+    things._items.close()
+
+
+def test_update_connects_while_fetching(
+    account: Account,
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    store = MemoryStore()
+    store.offset = 1000
+    things = ThingsClient(account, store=store)
+    assert not httpx_mock.get_requests()
+    httpx_mock.add_response(
+        201,
+        url="https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(
+        200,
+        url=f"https://cloud.culturedcode.com/version/1/history/{account_id}/items?start-index=1000",
+        json=history_data_new,
+    )
+    things.update()
+    # the offset of the store is kept, the session head is not needed
+    assert things._offset == 1234
+    assert things._session.head_index == 123
+
+
+def test_update_checkpoint(
+    account: Account,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+    tmp_path,
+):
+    db_path = tmp_path / "things.db"
+    more = {"end-total-content-size": 500, "latest-total-content-size": 1000}
+    last = {"end-total-content-size": 1000, "latest-total-content-size": 1000}
+    httpx_mock.reset()
+    httpx_mock.add_response(
+        201,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(200, json={**history_data_new, **more})
+    httpx_mock.add_response(200, json={**history_data_edit, **more})
+    httpx_mock.add_response(500)
+    things = ThingsClient(
+        account, store=SQLiteStore(db_path), checkpoint=Checkpoint(max_pages=3)
+    )
+    with pytest.raises(ThingsCloudException):
+        things.update()
+    assert things._offset == 125
+    things._items.close()
+
+    # the process died before the checkpoint, the sync starts over
+    httpx_mock.add_response(
+        201,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    things = ThingsClient(
+        account, store=SQLiteStore(db_path), checkpoint=Checkpoint(max_pages=2)
+    )
+    things.connect()
+    assert things._offset == 123
+    httpx_mock.add_response(200, json={**history_data_new, **more})
+    httpx_mock.add_response(200, json={**history_data_edit, **more})
+    httpx_mock.add_response(500)
+    with pytest.raises(ThingsCloudException):
+        things.update()
+    things._items.close()
+
+    # resumes from the checkpoint taken after two pages
+    httpx_mock.add_response(
+        201,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    things = ThingsClient(account, store=SQLiteStore(db_path))
+    things.connect()
+    assert things._offset == 125
+    edit = history_data_edit["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+    items = [{"aBCDiHyah4Uf0MQqp11jsX": {**edit, "p": {"tt": "test resumed"}}}]
+    httpx_mock.add_response(200, json={**history_data_edit, **last, "items": items})
+    things.update()
+    assert things._offset == 1234
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test resumed"
+    things._items.close()
+
+
+def test_update_checkpoint_close(
+    account: Account,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+    tmp_path,
+):
+    db_path = tmp_path / "things.db"
+    more = {"end-total-content-size": 500, "latest-total-content-size": 1000}
+    last = {"end-total-content-size": 1000, "latest-total-content-size": 1000}
+    edit = history_data_edit["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+    items = [{"aBCDiHyah4Uf0MQqp11jsX": {**edit, "p": {"tt": "third page"}}}]
+    third_page = {**history_data_edit, **more, "items": items}
+    httpx_mock.reset()
+    httpx_mock.add_response(
+        201,
+        json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+    )
+    httpx_mock.add_response(200, json={**history_data_new, **more})
+    httpx_mock.add_response(200, json={**history_data_edit, **more})
+    httpx_mock.add_response(200, json=third_page)
+    httpx_mock.add_response(500)
+    with SQLiteStore(db_path) as store:
+        things = ThingsClient(account, store=store, checkpoint=Checkpoint(max_pages=2))
+        things.connect()
+        with pytest.raises(ThingsCloudException):
+            things.update()
+        assert things._offset == 126
+
+    # closing the store did not save the third page with the offset of the second
+    with SQLiteStore(db_path) as store:
+        things = ThingsClient(account, store=store)
+        assert things._offset == 125
+        assert store["aBCDiHyah4Uf0MQqp11jsX"].title == "test updated"
+        httpx_mock.add_response(
+            201,
+            json={"headIndex": 123, "historyKeySessionSecret": "fake"},
+        )
+        things.connect()
+        httpx_mock.add_response(200, json={**third_page, **last})
+        things.update()
+        assert store["aBCDiHyah4Uf0MQqp11jsX"].title == "third page"
+
+
+def test_update_checkpoint_snapshot(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+    tmp_path,
+):
+    path = tmp_path / "things.snapshot"
+    things._checkpoint = Checkpoint(max_pages=10, max_delay=0, snapshot=path)
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json=history_data_new)
+    things.update()
+    assert not things._checkpoint.pending
+
+    things._items.clear()
+    things.load_snapshot(path)
+    assert things._offset == 1234
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+
+
+def test_update_retry_page(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json=history_data_new)
+    things.update()
+    edit = history_data_edit["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+    page = {
+        **history_data_edit,
+        "items": [
+            {"aBCDiHyah4Uf0MQqp11jsX": edit},
+            {"aBCDiHyah4Uf0MQqp11jsX": {**edit, "p": {"tt": "test retried"}}},
+        ],
+    }
+    apply_delta = things._items.apply_delta
+    applied = []
+
+    def fail_once(uuid: str, delta) -> None:
+        applied.append(delta.title)
+        if len(applied) == 2:
+            raise OSError("store unavailable")
+        apply_delta(uuid, delta)
+
+    monkeypatch.setattr(things._items, "apply_delta", fail_once)
+    httpx_mock.add_response(200, json=page)
+    with pytest.raises(OSError, match="unavailable"):
+        things.update()
+    httpx_mock.add_response(200, json=page)
+    things.update()
+    # the first edit of the interrupted page is not applied again
+    assert applied == ["test updated", "test retried", "test retried"]
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test retried"
+
+
+def test_update_drains_pages(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    first_page = {
+        **history_data_new,
+        "start-total-content-size": 100,
+        "end-total-content-size": 600,
+        "latest-total-content-size": 1000,
+    }
+    last_page = {
+        **history_data_edit,
+        "start-total-content-size": 600,
+        "end-total-content-size": 1000,
+        "latest-total-content-size": 1000,
+        "current-item-index": 125,
+    }
+    httpx_mock.add_response(200, json=first_page)
+    httpx_mock.add_response(200, json=last_page)
+
+    result = things.update()
+    requests = httpx_mock.get_requests()
+    assert [request.url.params["start-index"] for request in requests] == [
+        "123",
+        "124",
+    ]
+    assert result.start_index == 123
+    assert result.end_index == 125
+    assert result.pages == 2
+    assert result.items == 2
+    assert result.content_size == 900
+    assert things._offset == 125
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test updated"
+
+
+def test_update_at_head(things: ThingsClient, httpx_mock: HTTPXMock):
+    httpx_mock.reset()
+    httpx_mock.add_response(
+        200,
+        json={
+            "items": [],
+            "current-item-index": 123,
+            "schema": 301,
+            "start-total-content-size": 1000,
+            "end-total-content-size": 1000,
+            "latest-total-content-size": 1000,
+        },
+    )
+    result = things.update()
+    assert result.pages == 1
+    assert result.items == 0
+    assert things._offset == 123
+
+
+def test_update_stream(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json=history_data_new)
+    result = things.update(stream=True)
+    assert result.pages == 1
+    assert result.items == 1
+    assert things._offset == 1234
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+
+
+def test_update_trusted(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    things._trusted = True
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json=history_data_new)
+    things.update()
+    item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+    assert item.title == "test task"
+    assert item._synced_state is not None
+    assert item._projects == ["ABCd1ee0ykmXYZqT98huxa"]
+
+    httpx_mock.add_response(200, json=history_data_edit)
+    things.update()
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test updated"
+
+
+def test_update_lazy(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    store = things._items = LazyStore()
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json=history_data_new)
+    httpx_mock.add_response(200, json=history_data_edit)
+    things.update()
+    things.update()
+    entry = store._entries["aBCDiHyah4Uf0MQqp11jsX"]
+    assert isinstance(entry, TodoApiObject)
+    assert entry.title == "test updated"
+    item = things.query().where(project="ABCd1ee0ykmXYZqT98huxa").first()
+    assert item
+    assert item.title == "test updated"
+    assert store._entries[item.uuid] is item
+
+
+def test_update_fetch_ahead(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    first_page = {
+        **history_data_new,
+        "start-total-content-size": 100,
+        "end-total-content-size": 600,
+        "latest-total-content-size": 1000,
+    }
+    last_page = {
+        **history_data_edit,
+        "start-total-content-size": 600,
+        "end-total-content-size": 1000,
+        "latest-total-content-size": 1000,
+        "current-item-index": 125,
+    }
+    httpx_mock.add_response(200, json=first_page)
+    httpx_mock.add_response(200, json=last_page)
+
+    result = things.update(fetch_ahead=1)
+    requests = httpx_mock.get_requests()
+    assert [request.url.params["start-index"] for request in requests] == [
+        "123",
+        "124",
+    ]
+    assert result.pages == 2
+    assert things._offset == 125
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test updated"
+
+
+def test_update_fetch_ahead_error(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    first_page = {
+        **history_data_new,
+        "start-total-content-size": 100,
+        "end-total-content-size": 600,
+        "latest-total-content-size": 1000,
+    }
+    httpx_mock.add_response(200, json=first_page)
+    httpx_mock.add_response(500)
+    with pytest.raises(ThingsCloudException):
+        things.update(fetch_ahead=2)
+    # pages fetched before the error are applied
+    assert things._offset == 124
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test task"
+    with pytest.raises(ValueError, match="fetch_ahead"):
+        things.update(stream=True, fetch_ahead=1)
+
+
+def test_update_fan_out(
+    things: ThingsClient,
+    account_id: uuid.UUID,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    new_body = history_data_new["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]
+    edit = history_data_edit["items"][0]
+
+    def new(title: str) -> dict[str, Any]:
+        return {title * 22: {**new_body, "p": {**new_body["p"], "tt": title}}}
+
+    def page(items: list[dict[str, Any]], more: bool = True) -> dict[str, Any]:
+        return {
+            **history_data_new,
+            "items": items,
+            "current-item-index": 130,
+            "latest-total-content-size": 1000,
+            "end-total-content-size": 500 if more else 1000,
+        }
+
+    httpx_mock.reset()
+    url = f"https://cloud.culturedcode.com/version/1/history/{account_id}/items"
+    # windows of two items from 125 to the head at 130, pages overlap or fall short
+    pages = {
+        123: page([history_data_new["items"][0], new("b")]),
+        125: page([new("c"), new("d"), new("e")]),
+        127: page([new("e")]),
+        128: page([new("f"), edit]),
+        129: page([edit], more=False),
+        130: page([], more=False),
+    }
+    for start, data in pages.items():
+        httpx_mock.add_response(200, url=f"{url}?start-index={start}", json=data)
+
+    result = things.update(concurrency=3)
+    assert things._offset == 130
+    assert result.items == 7
+    assert sorted(things._items) == sorted(
+        ["aBCDiHyah4Uf0MQqp11jsX", *(title * 22 for title in "bcdef")]
+    )
+    # the edit is applied once, after the item was created
+    assert things._items["aBCDiHyah4Uf0MQqp11jsX"].title == "test updated"
+    with pytest.raises(ValueError, match="concurrency"):
+        things.update(concurrency=0)
+
+
+def test_update_decode_executor(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    history_data_edit: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    first_page = {
+        **history_data_new,
+        "start-total-content-size": 100,
+        "end-total-content-size": 600,
+        "latest-total-content-size": 1000,
+    }
+    last_page = {
+        **history_data_edit,
+        "start-total-content-size": 600,
+        "end-total-content-size": 1000,
+        "latest-total-content-size": 1000,
+        "current-item-index": 125,
+    }
+    httpx_mock.add_response(200, json=first_page)
+    httpx_mock.add_response(200, json=last_page)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        things._decode_executor = executor
+        result = things.update()
+    requests = httpx_mock.get_requests()
+    assert [request.url.params["start-index"] for request in requests] == [
+        "123",
+        "124",
+    ]
+    assert result.pages == 2
+    assert result.items == 2
+    assert things._offset == 125
+    # the edit of the second page is applied after the first page
+    item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+    assert item.title == "test updated"
+    assert item._projects == ["ABCd1ee0ykmXYZqT98huxa"]
+    assert item.note == Note()
+    with pytest.raises(ValueError, match="^no changes found$"):
+        item._to_edit()
+
+
+def test_update_decode_executor_invalid(
+    things: ThingsClient,
+    history_data_new: dict[str, Any],
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    uuid, body = next(iter(history_data_new["items"][0].items()))
+    invalid = {**history_data_new, "items": [{uuid: {**body, "p": {"tt": 1}}}]}
+    httpx_mock.add_response(200, json=invalid)
+    with ThreadPoolExecutor() as executor:
+        things._decode_executor = executor
+        with pytest.raises(pydantic.ValidationError):
+            things.update()
+        with pytest.raises(ValueError, match="decode executor"):
+            things.update(stream=True)
+    assert things._offset == 123
+    assert not things._items
+
+
+def test_commit_many(
+    things: ThingsClient, existing_task: TodoItem, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json={"server-head-index": 126})
+    existing_task.title = "batched update"
+    new_tasks = [TodoItem(title=f"batched {i}") for i in range(2)]
+    things.commit_many([existing_task, *new_tasks, existing_task])
+
+    request = httpx_mock.get_request()
+    assert request
+    assert request.url.params["ancestor-index"] == "123"
+    assert request.url.params["_cnt"] == "3"
+    payload = json.loads(request.content)
+    assert list(payload) == [existing_task.uuid, *(task.uuid for task in new_tasks)]
+    assert payload[existing_task.uuid]["t"] == 1
+    assert payload[new_tasks[0].uuid]["t"] == 0
+    assert things._offset == 126
+    for task in (existing_task, *new_tasks):
+        assert task._synced_state
+        assert things._items[task.uuid] is task
+    synced = existing_task._synced_state
+    assert synced
+    assert synced.title == "batched update"
+
+
+def test_commit_many_split(things: ThingsClient, httpx_mock: HTTPXMock):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json={"server-head-index": 125})
+    httpx_mock.add_response(200, json={"server-head-index": 127})
+    tasks = [TodoItem(title=f"batched {i}") for i in range(4)]
+    size = len(json.dumps(tasks[0].to_update().to_api_payload()))
+    things.commit_many(tasks, max_size=2 * size + 10)
+
+    first, second = httpx_mock.get_requests()
+    assert first.url.params["_cnt"] == "2"
+    assert first.url.params["ancestor-index"] == "123"
+    assert second.url.params["_cnt"] == "2"
+    assert second.url.params["ancestor-index"] == "125"
+    assert list(json.loads(second.content)) == [task.uuid for task in tasks[2:]]
+    assert things._offset == 127
+
+
+def test_bulk_edit(things: ThingsClient, httpx_mock: HTTPXMock):
+    tasks = [TodoItem(title=f"task {i}") for i in range(3)]
+    for task in tasks:
+        task._commit(task._to_new())
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    with things.bulk_edit(tasks) as items:
+        for item in items[:2]:
+            item.today()
+
+    request = httpx_mock.get_request()
+    assert request
+    assert request.url.params["_cnt"] == "2"
+    assert list(json.loads(request.content)) == [task.uuid for task in tasks[:2]]
+    assert tasks[0].is_today
+    assert things._offset == 124
+
+    # a second pass only commits the items it changes again
+    httpx_mock.add_response(200, json={"server-head-index": 125})
+    with things.bulk_edit(tasks) as items:
+        items[2].title = "renamed"
+    request = httpx_mock.get_requests()[-1]
+    assert request.url.params["_cnt"] == "1"
+    assert list(json.loads(request.content)) == [tasks[2].uuid]
+    with things.bulk_edit(tasks):
+        pass
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.fixture()
+def write_behind(things: ThingsClient) -> CommitQueue:
+    things._queue = CommitQueue(max_items=3, max_delay=60)
+    return things._queue
+
+
+def test_write_behind_coalesces_edits(
+    things: ThingsClient,
+    write_behind: CommitQueue,
+    existing_task: TodoItem,
+    httpx_mock: HTTPXMock,
+):
+    httpx_mock.reset()
+    existing_task.title = "first edit"
+    things.commit(existing_task)
+    existing_task.today()
+    things.commit(existing_task)
+    existing_task.complete()
+    things.commit(existing_task)
+    assert not httpx_mock.get_requests()
+    assert len(write_behind) == 1
+
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    things.flush()
+    request = httpx_mock.get_request()
+    assert request
+    assert request.url.params["_cnt"] == "1"
+    payload = json.loads(request.content)[existing_task.uuid]["p"]
+    assert payload["tt"] == "first edit"
+    assert payload["ss"] == Status.COMPLETE
+    assert payload["sr"] is not None
+    assert not write_behind
+    assert things._offset == 124
+
+
+def test_write_behind_flush_on_size(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    tasks = [TodoItem(title=f"queued {i}") for i in range(3)]
+    for task in tasks:
+        things.commit(task)
+    request = httpx_mock.get_request()
+    assert request
+    assert request.url.params["_cnt"] == "3"
+    assert not write_behind
+
+
+def test_write_behind_flush_on_delay(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    with freeze_time() as frozen:
+        things.commit(TodoItem(title="queued"))
+        assert not httpx_mock.get_requests()
+        frozen.tick(61)
+        httpx_mock.add_response(200, json={"server-head-index": 125})
+        things.commit(TodoItem(title="queued later"))
+    request = httpx_mock.get_request()
+    assert request
+    assert request.url.params["_cnt"] == "2"
+
+
+def test_write_behind_failed_flush_keeps_items(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(500)
+    task = TodoItem(title="queued")
+    things.commit(task)
+    with pytest.raises(ThingsCloudException):
+        things.flush()
+    assert task in write_behind
+    assert task._synced_state is None
+    # closing tries again, the connection is closed even if that fails
+    httpx_mock.add_response(500)
+    with pytest.raises(ThingsCloudException):
+        things.close()
+    assert task in write_behind
+    assert things._client.is_closed
+
+
+def test_write_behind_flush_on_close(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    task = TodoItem(title="queued")
+    things.commit(task)
+    assert not httpx_mock.get_requests()
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    with things:
+        pass
+    request = httpx_mock.get_request()
+    assert request
+    assert json.loads(request.content)[task.uuid]["p"]["tt"] == "queued"
+    assert not write_behind
+    assert task._synced_state
+
+
+def test_write_behind_skips_committed_item(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    httpx_mock.add_response(200, json={"server-head-index": 124})
+    httpx_mock.add_response(200, json={"server-head-index": 125})
+    task = TodoItem(title="queued")
+    things.commit(task)
+    things.flush()
+    task.title = "edited"
+    things.commit(task)
+    things.flush()
+    assert len(httpx_mock.get_requests()) == 2
+    # committed items are unchanged until they are edited again
+    things.commit(task)
+    things.flush()
+    assert len(httpx_mock.get_requests()) == 2
+    assert not write_behind
+
+
+def test_write_behind_not_flushed_on_del(
+    things: ThingsClient, write_behind: CommitQueue, httpx_mock: HTTPXMock
+):
+    httpx_mock.reset()
+    task = TodoItem(title="queued")
+    things.commit(task)
+    with capture_logs() as logs:
+        things.__del__()
+    assert not httpx_mock.get_requests()
+    assert things._client.is_closed
+    assert task in write_behind
+    assert logs[0]["event"] == "dropping items that were never committed"
+    assert logs[0]["items"] == 1
+
+
+@freeze_time(datetime(2022, 1, 3, 10, 0, 0))
+def test_today(things: ThingsClient, history_data_new: dict[str, Any]):
+    history_data_new["items"][0]["aBCDiHyah4Uf0MQqp11jsX"]["p"]["sr"] = 1641168000
+    things._process_history(HistoryResponse.model_validate(history_data_new))
+    local = TodoItem(title="local")
+    local.today()
+    things._items[local.uuid] = local
+    other = TodoItem(title="not today")
+    things._items[other.uuid] = other
+
+    assert {item.uuid for item in things.today()} == {
+        "aBCDiHyah4Uf0MQqp11jsX",
+        local.uuid,
+    }
+
+
+def test_snapshot(
+    things: ThingsClient,
+    history_new: HistoryResponse,
+    tmp_path,
+):
+    path = tmp_path / "things.snapshot"
+    things._process_history(history_new)
+    things._offset = 1234
+    things.save_snapshot(path)
+
+    things._items.clear()
+    things._offset = 123
+    things.load_snapshot(path)
+    assert things._offset == 1234
+    assert things._items.offset == 1234
+    item = things._items["aBCDiHyah4Uf0MQqp11jsX"]
+    assert item.title == "test task"
+    assert item._synced_state
+    assert things.query().where(project="ABCd1ee0ykmXYZqT98huxa").all() == [item]
+
+    things._account._info.history_key = uuid.uuid4()
+    with pytest.raises(ValueError, match="different account"):
+        things.load_snapshot(path)
@@ -1,5 +1,7 @@
+import json
 from datetime import UTC, datetime, time
 
+import pydantic
 import pytest
 from freezegun import freeze_time
 
@@ -9,8 +11,10 @@ from things_cloud.models.todo import (
     Note,
     Status,
     TodoApiObject,
+    TodoDeltaApiObject,
     TodoItem,
     Type,
+    batch_edit,
 )
 from things_cloud.utils import Util
 
@@ -445,6 +449,54 @@ def test_todo_from_api_object():
     assert todo._synced_state == api_object
 
 
+def test_todo_from_api_object_without_validation(task: TodoItem):
+    task.tags = ["tag"]
+    api_object = task._to_new()
+    validated = api_object.to_todo(uuid=task.uuid)
+    constructed = api_object.to_todo(validate=False, uuid=task.uuid)
+    assert constructed == validated
+    assert constructed.__pydantic_private__ == validated.__pydantic_private__
+    assert constructed.__pydantic_fields_set__ == validated.__pydantic_fields_set__
+    # the item does not share mutable state with its synced baseline
+    constructed.tags.append("other")
+    assert api_object.tags == ["tag"]
+    with pytest.raises(ValueError, match="^no changes found$"):
+        validated._to_edit()
+
+
+def test_decoded_items_share_values(task: TodoItem):
+    task.tags = ["tag"]
+    raw = task._to_new().model_dump_json(by_alias=True)
+    first = TodoApiObject.model_validate(json.loads(raw)).to_todo(validate=False)
+    second = TodoApiObject.model_validate(json.loads(raw)).to_todo()
+    assert first.tags[0] is second.tags[0]
+    assert first.__pydantic_fields_set__ is second.__pydantic_fields_set__
+    # notes can be modified in place, so every item has its own
+    assert first.note is not second.note
+    assert first.xx.sn is not second.xx.sn
+    assert first.note.__pydantic_fields_set__ is second.note.__pydantic_fields_set__
+
+
+def test_note_modified_in_place(task: TodoItem):
+    other = TodoItem(title="other")
+    task.note.value = "note"
+    task.xx.sn["key"] = 1
+    assert other.note.value == ""
+    assert other.xx.sn == {}
+    task._commit(task._to_new())
+
+    task.note.value = "edited"
+    task.xx.sn["key"] = 2
+    edit = task._to_edit()
+    assert edit.edited_fields() == ["modification_date", "note", "xx"]
+    assert edit.note is not None and edit.note.value == "edited"
+    task._commit(edit)
+    assert task._synced_state is not None
+    assert task._synced_state.note.value == "edited"
+    task.title = "renamed"
+    assert task._to_edit().edited_fields() == ["title", "modification_date"]
+
+
 def test_to_new(task: TodoItem):
     assert task._synced_state is None
     new = task._to_new()
@@ -509,3 +561,116 @@ def test_to_edit_detect_reverts(task: TodoItem):
     task.title = "test task"  # but then we revert to the old value
     with pytest.raises(ValueError, match="no changes found"):
         task._to_edit()
+
+
+def test_to_edit_changed_fields(task: TodoItem):
+    task._commit(task._to_new())
+    assert task._baseline == {}
+
+    task.title = "updated task"
+    task.complete()
+    # only the synced values of assigned fields are kept
+    assert task._baseline == {
+        "title": "test task",
+        "status": Status.TODO,
+        "completion_date": None,
+    }
+    delta = task._to_edit()
+    assert delta.edited_fields() == [
+        "title",
+        "status",
+        "modification_date",
+        "completion_date",
+    ]
+    task._commit(delta)
+    # the delta has its own modification date
+    assert task._baseline is not None
+    assert task._baseline.keys() <= {"modification_date"}
+    assert task._synced_state
+    assert task._synced_state.status is Status.COMPLETE
+
+
+def test_to_edit_modified_in_place(task: TodoItem):
+    task._commit(task._to_new())
+    task.tags.append("tag")
+    delta = task._to_edit()
+    assert delta.tags == ["tag"]
+
+
+def test_synced_state_copy_on_write(task: TodoItem):
+    task.tags = ["tag"]
+    synced = task._to_new()
+    todo = synced.to_todo()
+    # only lists are copied, other fields are shared with the current state
+    assert todo._baseline == {"tags": ("tag",)}
+    todo.title = "first"
+    todo.title = "second"
+    todo.tags.clear()
+    assert todo._baseline == {"tags": ("tag",), "title": "test task"}
+    assert todo._synced_state == synced
+    delta = todo._to_edit()
+    assert delta.title == "second"
+    assert delta.tags == []
+
+
+def test_apply_edits(task: TodoItem):
+    task._commit(task._to_new())
+    delta = TodoDeltaApiObject(title="edited elsewhere")
+    delta.apply_edits(task)
+    assert task.title == "edited elsewhere"
+    # incoming edits are part of the synced state and not sent back
+    assert task._synced_state
+    assert task._synced_state.title == "edited elsewhere"
+    assert task._baseline == {}
+    with pytest.raises(ValueError, match="^no changes found$"):
+        task._to_edit()
+
+
+def test_batch_edit(task: TodoItem):
+    task._commit(task._to_new())
+    with task.batch_edit():
+        task.title = "renamed"
+        task.scheduled_date = 1733747519  # type: ignore[assignment]
+        # assignments are not validated inside the block
+        assert task.scheduled_date == 1733747519
+        with pytest.raises(RuntimeError):
+            task.to_update()
+    assert task.scheduled_date == datetime(2024, 12, 9, 12, 31, 59, tzinfo=UTC)
+    assert task._to_edit().edited_fields() == [
+        "title",
+        "modification_date",
+        "scheduled_date",
+    ]
+    task.title = "validated again"
+    with pytest.raises(pydantic.ValidationError):
+        task.title = None  # type: ignore[assignment]
+
+
+def test_batch_edit_invalid(task: TodoItem, project: TodoItem):
+    with pytest.raises(pydantic.ValidationError):
+        with batch_edit([task, project]):
+            task.title = "renamed"
+            project.title = "renamed project"
+            project.index = "not an index"  # type: ignore[assignment]
+    # all items are restored
+    assert task.title == "test task"
+    assert project.title == "test project"
+    assert project.index == 0
+    assert task._batch is None
+
+
+def test_batch_edit_restores_setters(task: TodoItem, project: TodoItem):
+    task._commit(task._to_new())
+    with pytest.raises(RuntimeError):
+        with task.batch_edit():
+            task.complete()
+            task.project = project
+            task.evening()
+            raise RuntimeError
+    assert task.status is Status.TODO
+    assert task.completion_date is None
+    assert task.project is None
+    assert task.destination is Destination.INBOX
+    assert not task._evening
+    with pytest.raises(ValueError, match="^no changes found$"):
+        task._to_edit()
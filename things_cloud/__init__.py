@@ -1 +1,2 @@
+from things_cloud.api.async_client import AsyncThingsClient  # noqa
 from things_cloud.api.client import ThingsClient  # noqa
@@ -2,13 +2,19 @@ from __future__ import annotations
 
 import base64
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import StrEnum
+from typing import TYPE_CHECKING, Any
 from urllib.parse import quote
 
 import httpx
 import pydantic
 
+from things_cloud.api.transport import TIMEOUT, Transport
+
+if TYPE_CHECKING:
+    from things_cloud.api.cache import SessionCache
+
 
 class Credentials(pydantic.BaseModel):
     email: pydantic.EmailStr
@@ -43,34 +49,143 @@ class SharedSession(pydantic.BaseModel):
 
 @dataclass
 class Account:
+    """Logged in account.
+
+    With a `transport` the login, the sessions and the clients of the account
+    share its pooled connections. With a `cache` the login and the session are
+    reused from an earlier login with the same credentials, see `SessionCache`.
+    """
+
     _credentials: Credentials
     _info: AccountInfo
+    _transport: Transport | None = field(default=None, repr=False, compare=False)
+    _cache: SessionCache | None = field(default=None, repr=False, compare=False)
 
     @classmethod
-    def login(cls, credentials: Credentials) -> Account:
-        response = httpx.get(
-            f"https://cloud.culturedcode.com/version/1/account/{credentials.email}",
-            headers={
-                "Authorization": f"Password {quote(credentials.password.get_secret_value(), safe="'")}",
-            },
-        )
-        # TODO: handle 401 Unauthorized
-        if not response.is_success:
-            print(response.status_code, response.read())
-            raise RuntimeError()
-        content = response.json()
-        info = AccountInfo.model_validate(content)
-        return Account(_credentials=credentials, _info=info)
+    def login(
+        cls,
+        credentials: Credentials,
+        transport: Transport | None = None,
+        cache: SessionCache | None = None,
+    ) -> Account:
+        info = cache.info(credentials) if cache is not None else None
+        if info is None:
+            with _client(transport) as client:
+                response = client.get(**_login_request(credentials))
+            info = _login_info(credentials, response, cache)
+        return cls(credentials, info, transport, cache)
+
+    @classmethod
+    async def alogin(
+        cls,
+        credentials: Credentials,
+        transport: Transport | None = None,
+        cache: SessionCache | None = None,
+    ) -> Account:
+        info = cache.info(credentials) if cache is not None else None
+        if info is None:
+            async with _async_client(transport) as client:
+                response = await client.get(**_login_request(credentials))
+            info = _login_info(credentials, response, cache)
+        return cls(credentials, info, transport, cache)
+
+    def relogin(self, transport: Transport | None = None) -> None:
+        """Log in again, after the server rejected a request of the account."""
+        if self._cache is not None:
+            self._cache.invalidate(self._credentials)
+        with _client(transport or self._transport) as client:
+            response = client.get(**_login_request(self._credentials))
+        self._info = _login_info(self._credentials, response, self._cache)
+
+    async def arelogin(self, transport: Transport | None = None) -> None:
+        if self._cache is not None:
+            self._cache.invalidate(self._credentials)
+        async with _async_client(transport or self._transport) as client:
+            response = await client.get(**_login_request(self._credentials))
+        self._info = _login_info(self._credentials, response, self._cache)
+
+    @property
+    def transport(self) -> Transport | None:
+        return self._transport
 
-    def new_session(self) -> SharedSession:
-        response = httpx.post(
-            "https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
-            headers={
+    @property
+    def cache(self) -> SessionCache | None:
+        return self._cache
+
+    @property
+    def history_key(self) -> str:
+        return str(self._info.history_key)
+
+    def new_session(
+        self, transport: Transport | None = None, use_cache: bool = True
+    ) -> SharedSession:
+        """Start a shared session, or reuse the cached one with `use_cache`."""
+        if use_cache and (session := self._cached_session()) is not None:
+            return session
+        with _client(transport or self._transport) as client:
+            response = client.post(**self._session_request())
+        return self._from_session_response(response)
+
+    async def anew_session(
+        self, transport: Transport | None = None, use_cache: bool = True
+    ) -> SharedSession:
+        if use_cache and (session := self._cached_session()) is not None:
+            return session
+        async with _async_client(transport or self._transport) as client:
+            response = await client.post(**self._session_request())
+        return self._from_session_response(response)
+
+    def _cached_session(self) -> SharedSession | None:
+        if self._cache is None:
+            return None
+        return self._cache.session(self._credentials)
+
+    def _session_request(self) -> dict[str, Any]:
+        return {
+            "url": "https://cloud.culturedcode.com/api/account/login/getT3SharedSession",
+            "headers": {
                 "Authorization": f"B64SON {self._credentials.as_encoded_payload()}"
             },
-        )
+        }
+
+    def _from_session_response(self, response: httpx.Response) -> SharedSession:
         if not response.is_success:
             print(response.status_code, response.read())
             raise RuntimeError()
         content = response.json()
-        return SharedSession.model_validate(content)
+        session = SharedSession.model_validate(content)
+        if self._cache is not None:
+            self._cache.put_session(self._credentials, session)
+        return session
+
+
+def _login_info(
+    credentials: Credentials, response: httpx.Response, cache: SessionCache | None
+) -> AccountInfo:
+    # TODO: handle 401 Unauthorized
+    if not response.is_success:
+        print(response.status_code, response.read())
+        raise RuntimeError()
+    content = response.json()
+    info = AccountInfo.model_validate(content)
+    if cache is not None:
+        cache.put(credentials, info)
+    return info
+
+
+def _login_request(credentials: Credentials) -> dict[str, Any]:
+    return {
+        "url": f"https://cloud.culturedcode.com/version/1/account/{credentials.email}",
+        "headers": {
+            "Authorization": f"Password {quote(credentials.password.get_secret_value(), safe="'")}",
+        },
+    }
+
+
+def _client(transport: Transport | None) -> httpx.Client:
+    # without a transport the connection is closed together with the client
+    return transport.client() if transport else httpx.Client(timeout=TIMEOUT)
+
+
+def _async_client(transport: Transport | None) -> httpx.AsyncClient:
+    return transport.async_client() if transport else httpx.AsyncClient(timeout=TIMEOUT)
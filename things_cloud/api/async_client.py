@@ -0,0 +1,382 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+
+from httpx import Request, RequestError, Response
+from structlog import get_logger
+
+from things_cloud.api.account import Account
+from things_cloud.api.base import BaseClient, SyncResult
+from things_cloud.api.checkpoint import Checkpoint
+from things_cloud.api.const import HEADERS, MAX_COMMIT_SIZE
+from things_cloud.api.decode import (
+    MAX_PENDING_PAGES,
+    DecodedPage,
+    decode_page,
+    read_page,
+)
+from things_cloud.api.exceptions import ThingsCloudException
+from things_cloud.api.queue import CommitQueue
+from things_cloud.api.transport import Transport
+from things_cloud.models.todo import (
+    CommitResponse,
+    HistoryPage,
+    HistoryResponse,
+    TodoItem,
+    Update,
+    batch_edit,
+)
+from things_cloud.store import ItemStore
+
+log = get_logger()
+
+
+class AsyncThingsClient(BaseClient):
+    """Asyncio counterpart of `ThingsClient`.
+
+    Creating the client does no I/O, the shared session is set up by
+    `connect`, which is awaited implicitly on first use.
+    """
+
+    def __init__(
+        self,
+        account: Account,
+        store: ItemStore | None = None,
+        write_behind: CommitQueue | None = None,
+        trusted: bool = False,
+        decode_executor: Executor | None = None,
+        checkpoint: Checkpoint | None = None,
+        transport: Transport | None = None,
+    ) -> None:
+        super().__init__(
+            account,
+            store,
+            write_behind,
+            trusted,
+            decode_executor,
+            checkpoint,
+            transport,
+        )
+        self.__login_lock = asyncio.Lock()
+        self._client = self._transport.async_client(
+            base_url=self._base_url,
+            headers=HEADERS,
+            event_hooks={
+                "request": [self._alog_request],
+                "response": [self._alog_response, self._araise_on_4xx_5xx],
+            },
+        )
+
+    async def __aenter__(self) -> "AsyncThingsClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Commit the items queued in write-behind mode, then close the connections."""
+        try:
+            if self._queue and not self._client.is_closed:
+                await self.flush()
+        finally:
+            await self._client.aclose()
+            if self._owns_transport and not self._transport.closed:
+                await self._transport.aclose()
+
+    async def connect(self) -> None:
+        """Set up the shared session, done implicitly on first use."""
+        if self._connected:
+            return
+        self._start_session(
+            await self._account.anew_session(self._transport, self._resuming)
+        )
+
+    @asynccontextmanager
+    async def __connecting(self) -> AsyncIterator[None]:
+        """Set up the session, while history is fetched if the store has an offset."""
+        if self._connected or not self._resuming:
+            await self.connect()
+            yield
+            return
+        connecting = asyncio.ensure_future(self.connect())
+        try:
+            yield
+        except BaseException:
+            connecting.cancel()
+            raise
+        await connecting
+
+    @classmethod
+    async def _alog_request(cls, request: Request) -> None:
+        cls.log_request(request)
+
+    @classmethod
+    async def _araise_on_4xx_5xx(cls, response: Response) -> None:
+        cls.raise_on_4xx_5xx(response)
+
+    @staticmethod
+    async def _alog_response(response: Response) -> None:
+        request = response.request
+        log.debug(
+            f"Response: {request.method} {request.url}", status=response.status_code
+        )
+        await response.aread()  # access response body
+        log.debug("Body", content=response.content)
+
+    async def update(self, fetch_ahead: int = 0, concurrency: int = 1) -> SyncResult:
+        """Fetch and apply history pages until the server head is reached.
+
+        With `fetch_ahead` up to that many pages are downloaded by a background
+        task while the current page is applied. With a `decode_executor` pages
+        are decoded by its workers while the next pages are fetched, they are
+        still applied in order. With `concurrency` the history up to the server
+        head is fetched in windows of one page, that many at a time, see
+        `_apply_window`.
+        """
+        self._begin_update(fetch_ahead, concurrency)
+        if self._queue and self._queue.due:
+            await self.flush()
+        async with self.__connecting():
+            result = SyncResult(start_index=self._offset, end_index=self._offset)
+            # a fan-out stops at the head it saw first, the history added since
+            # then is synced in order like without it
+            keep_syncing = concurrency == 1 or await self.__update_fan_out(
+                result, concurrency
+            )
+            if keep_syncing:
+                await self.__update_in_order(result, fetch_ahead)
+            self._end_update()
+        return result
+
+    async def __update_in_order(self, result: SyncResult, fetch_ahead: int) -> None:
+        if self._decode_executor is not None:
+            await self.__update_parallel(result, self._decode_executor)
+        elif fetch_ahead:
+            await self.__update_fetch_ahead(result, fetch_ahead)
+        else:
+            while True:
+                data = await self.__fetch(self._offset)
+                self._process_history(data)
+                if not self._apply_page(result, data, len(data.items)):
+                    break
+
+    async def __update_fan_out(self, result: SyncResult, concurrency: int) -> bool:
+        """Apply the history up to the server head in concurrently fetched windows.
+
+        Returns whether to keep syncing, which is the case unless the first page
+        already reached the head.
+        """
+        first = await self.__fetch(self._offset)
+        self._process_history(first)
+        size = len(first.items)
+        if not self._apply_page(result, first, size):
+            return False
+        head = first.current_item_index
+        windows = iter(range(self._offset, head, size))
+        pending: deque[tuple[int, asyncio.Task[HistoryResponse]]] = deque()
+        try:
+            while True:
+                while (
+                    len(pending) < concurrency
+                    and (start := next(windows, None)) is not None
+                ):
+                    pending.append((start, asyncio.create_task(self.__fetch(start))))
+                if not pending:
+                    return True
+                start, task = pending.popleft()
+                end = min(start + size, head)
+                history = await task
+                while self._apply_window(result, history, end):
+                    history = await self.__fetch(self._offset)
+                if self._offset != end:
+                    return True
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    async def __update_fetch_ahead(self, result: SyncResult, depth: int) -> None:
+        pages: asyncio.Queue[tuple[bytes, HistoryPage, int] | Exception | None] = (
+            asyncio.Queue(depth)
+        )
+
+        async def fetch() -> None:
+            index = self._offset
+            try:
+                while True:
+                    content = await self.__fetch_content(index)
+                    page, item_count = read_page(content)
+                    await pages.put((content, page, item_count))
+                    index = page.next_index(index, item_count)
+                    if not page.has_more or item_count == 0:
+                        break
+                await pages.put(None)
+            except Exception as e:
+                await pages.put(e)
+
+        task = asyncio.create_task(fetch())
+        try:
+            while (entry := await pages.get()) is not None:
+                if isinstance(entry, Exception):
+                    raise entry
+                content, page, item_count = entry
+                self._process_history(HistoryResponse.model_validate_json(content))
+                self._apply_page(result, page, item_count)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def __update_parallel(self, result: SyncResult, executor: Executor) -> None:
+        loop = asyncio.get_running_loop()
+        pending: deque[asyncio.Future[DecodedPage]] = deque()
+        index = self._offset
+        more = True
+        try:
+            while more or pending:
+                if more and len(pending) < MAX_PENDING_PAGES:
+                    content = await self.__fetch_content(index)
+                    page, item_count = read_page(content)
+                    pending.append(
+                        loop.run_in_executor(
+                            executor, decode_page, content, not self._trusted
+                        )
+                    )
+                    index = page.next_index(index, item_count)
+                    more = page.has_more and item_count > 0
+                # apply decoded pages in order, wait once there is nothing to fetch
+                while pending and (
+                    pending[0].done() or not more or len(pending) >= MAX_PENDING_PAGES
+                ):
+                    self._apply_decoded(result, await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def commit(self, item: TodoItem) -> None:
+        """Commit an item, or queue it when the client is in write-behind mode."""
+        if self._queue is None:
+            await self.commit_many([item])
+            return
+        self._queue.add(item)
+        if self._queue.due:
+            await self.flush()
+
+    async def commit_many(
+        self,
+        items: Iterable[TodoItem],
+        max_size: int = MAX_COMMIT_SIZE,
+        skip_unchanged: bool = False,
+    ) -> None:
+        """Commit all items with as few requests as possible.
+
+        Updates are sent in batches of at most `max_size` serialized bytes. If a
+        request fails, the items of earlier batches remain committed. Items without
+        changes raise a `ValueError`, unless `skip_unchanged` is set.
+        """
+        await self.connect()
+        for batch in self._commit_batches(items, max_size, skip_unchanged):
+            await self.__commit_batch(batch)
+
+    @asynccontextmanager
+    async def bulk_edit(
+        self, items: Iterable[TodoItem]
+    ) -> AsyncIterator[list[TodoItem]]:
+        """Edit items without validating every assignment, then commit them.
+
+        Each item is validated once when the block is left, see `batch_edit`.
+        Changed items are committed together, or queued in write-behind mode.
+        """
+        items = list(items)
+        with batch_edit(items):
+            yield items
+        if self._queue is None:
+            await self.commit_many(items, skip_unchanged=True)
+            return
+        for item in items:
+            await self.commit(item)
+
+    async def flush(self) -> None:
+        """Commit all items queued in write-behind mode.
+
+        Items without changes are skipped; items that could not be committed stay
+        queued for the next flush.
+        """
+        if not self._queue:
+            return
+        await self.connect()
+        items = self._queue.drain()
+        done: set[str] = set()  # committed or unchanged
+        try:
+            for batch in self._commit_batches(items, skip_unchanged=True, skipped=done):
+                await self.__commit_batch(batch)
+                done.update(item.uuid for item, _ in batch)
+        finally:
+            self._queue.restore(item for item in items if item.uuid not in done)
+
+    async def __commit_batch(self, batch: list[tuple[TodoItem, Update]]) -> None:
+        try:
+            commit = await self.__commit(batch)
+            self._apply_commit(batch, commit.server_head_index)
+        except ThingsCloudException as e:
+            log.error("Error commiting")
+            raise e
+
+    async def __request(self, method: str, endpoint: str, **kwargs) -> Response:
+        logins = self._logins
+        try:
+            return await self.__send(method, endpoint, **kwargs)
+        except ThingsCloudException as e:
+            if not self._should_relogin(e):
+                raise
+        await self.__relogin(logins)
+        return await self.__send(method, endpoint, **kwargs)
+
+    async def __relogin(self, logins: int) -> None:
+        """Log in again, unless another task did since the rejected request was sent."""
+        async with self.__login_lock:
+            if self._logins != logins:
+                return
+            log.info("request was not authorized, logging in again")
+            await self._account.arelogin(self._transport)
+            self._relogged_in(
+                await self._account.anew_session(self._transport, use_cache=False)
+            )
+            self._client.base_url = self._base_url
+
+    async def __send(self, method: str, endpoint: str, **kwargs) -> Response:
+        try:
+            return await self._client.request(method, endpoint, **kwargs)
+        except RequestError as e:
+            raise ThingsCloudException from e
+
+    async def __fetch(self, index: int) -> HistoryResponse:
+        return HistoryResponse.model_validate_json(await self.__fetch_content(index))
+
+    async def __fetch_content(self, index: int) -> bytes:
+        response = await self.__request(
+            "GET",
+            "/items",
+            params={
+                "start-index": str(index),
+            },
+        )
+        if response.status_code == 200:
+            return response.content
+        else:
+            log.error("Error getting current index", response=response)
+            raise ThingsCloudException
+
+    async def __commit(self, batch: list[tuple[TodoItem, Update]]) -> CommitResponse:
+        response = await self.__request(
+            method="POST",
+            endpoint="/commit",
+            params={
+                "ancestor-index": str(self._offset),
+                "_cnt": str(len(batch)),
+            },
+            json=self._commit_payload(batch),
+        )
+        return CommitResponse.model_validate_json(response.content)
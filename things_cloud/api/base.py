@@ -0,0 +1,335 @@
+import json
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any
+
+from httpx import HTTPStatusError, Request, Response
+from structlog import get_logger
+
+from things_cloud.api.account import Account, SharedSession
+from things_cloud.api.checkpoint import Checkpoint
+from things_cloud.api.const import API_BASE, MAX_COMMIT_SIZE
+from things_cloud.api.decode import DecodedPage
+from things_cloud.api.exceptions import ThingsCloudException
+from things_cloud.api.queue import CommitQueue
+from things_cloud.api.transport import Transport
+from things_cloud.models.todo import (
+    EditBody,
+    HistoryPage,
+    HistoryResponse,
+    NewBody,
+    TodoItem,
+    Update,
+    UpdateType,
+)
+from things_cloud.store import (
+    ItemStore,
+    MemoryStore,
+    Query,
+    load_snapshot,
+    save_snapshot,
+)
+from things_cloud.utils import Util
+
+log = get_logger()
+
+STREAM_EXTENSION = "things_cloud.stream"
+# responses to requests of an account whose cached login is no longer valid
+AUTH_ERROR_CODES = frozenset({401, 403})
+
+
+@dataclass
+class SyncResult:
+    """Summary of the history pages applied by a sync."""
+
+    start_index: int
+    end_index: int
+    pages: int = 0
+    items: int = 0
+    content_size: int = 0
+    head_index: int | None = None  # server head reported by the last page
+
+    def add(self, page: HistoryPage, item_count: int, end_index: int) -> None:
+        self.pages += 1
+        self.items += item_count
+        self.content_size += page.content_size
+        self.end_index = end_index
+        self.head_index = page.current_item_index
+
+    @property
+    def lag(self) -> int | None:
+        """History items the sync ended behind the server head."""
+        if self.head_index is None:
+            return None
+        return max(self.head_index - self.end_index, 0)
+
+
+class BaseClient:
+    """State and history handling shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        account: Account,
+        store: ItemStore | None = None,
+        write_behind: CommitQueue | None = None,
+        trusted: bool = False,
+        decode_executor: Executor | None = None,
+        checkpoint: Checkpoint | None = None,
+        transport: Transport | None = None,
+    ) -> None:
+        self._account = account
+        # shared with other clients, a transport created here is closed with the client
+        self._owns_transport = transport is None and account.transport is None
+        self._transport = transport or account.transport or Transport()
+        self._items: ItemStore = store if store is not None else MemoryStore()
+        self._queue = write_behind
+        # build items from already validated server data without validating again
+        self._trusted = trusted
+        # decodes history pages in parallel, see `decode_page`
+        self._decode_executor = decode_executor
+        self._checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+        # updates of the page at the offset that were already applied by a sync
+        # that was interrupted, they are skipped when the page is fetched again
+        self._page_applied = 0
+        self._page_position = 0
+        self._base_url: str = f"{API_BASE}/history/{account._info.history_key}"
+        # resume from the last applied index if the store has one, otherwise the
+        # session sets it to the server head
+        self._offset = self._items.offset if self._items.offset is not None else 0
+        self._connected = False
+        # counts the logins that replaced a stale one, a request that was rejected
+        # before the last of them does not log in again
+        self._logins = 0
+
+    def _start_session(self, session: SharedSession) -> None:
+        self._session = session
+        if self._items.offset is None:
+            self._offset = session.head_index
+        self._connected = True
+
+    def _relogged_in(self, session: SharedSession) -> None:
+        """Use the history key and the session of a login that replaced a stale one.
+
+        The offset is kept, the history that was already applied stays applied.
+        """
+        self._base_url = f"{API_BASE}/history/{self._account.history_key}"
+        self._session = session
+        self._connected = True
+        self._logins += 1
+
+    @staticmethod
+    def log_request(request: Request) -> None:
+        log.debug(f"Request: {request.method} {request.url} - Waiting for response")
+
+    @staticmethod
+    def raise_on_4xx_5xx(response: Response) -> None:
+        """Raises a HTTPStatusError on 4xx and 5xx responses."""
+        try:
+            response.raise_for_status()
+        except HTTPStatusError as err:
+            raise ThingsCloudException from err
+
+    def _should_relogin(self, err: ThingsCloudException) -> bool:
+        """Whether a request was rejected because the cached login is stale."""
+        cause = err.__cause__
+        return (
+            self._account.cache is not None
+            and isinstance(cause, HTTPStatusError)
+            and cause.response.status_code in AUTH_ERROR_CODES
+        )
+
+    @property
+    def _resuming(self) -> bool:
+        """Whether the store has an offset and the session head is not needed.
+
+        History can then be fetched while the session is set up, and a cached
+        session is safe to use.
+        """
+        return self._items.offset is not None
+
+    def _begin_update(self, fetch_ahead: int, concurrency: int) -> None:
+        if fetch_ahead < 0:
+            raise ValueError("fetch_ahead must not be negative")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._page_position = 0
+
+    def _end_update(self) -> None:
+        if self._checkpoint.pending:
+            self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        """Persist the applied pages, never called in the middle of a page."""
+        self._persist()
+        if self._checkpoint.snapshot is not None:
+            self.save_snapshot(self._checkpoint.snapshot)
+        log.debug(
+            "saved checkpoint", offset=self._offset, pages=self._checkpoint.pending
+        )
+        self._checkpoint.done()
+
+    def _process_history(self, history: HistoryResponse) -> None:
+        for update in history.updates:
+            self._apply_update(update)
+
+    def _apply_update(self, update: Update, validated: bool = False) -> None:
+        position = self._page_position
+        self._page_position += 1
+        if position < self._page_applied:
+            log.debug("skipping applied update", update=update)
+            return
+        self._items.sync_pending = True
+        log.debug("processing update", update=update)
+        match update.body.type:
+            case UpdateType.NEW:
+                assert isinstance(
+                    update.body, NewBody
+                )  # HACK: type narrowing does not work
+                self._items.add_payload(
+                    update.id,
+                    update.body.payload,
+                    validate=not (self._trusted or validated),
+                )
+            case UpdateType.EDIT:
+                assert isinstance(update.body, EditBody)
+                try:
+                    self._items.apply_delta(update.id, update.body.payload)
+                except KeyError as key_err:
+                    msg = f"todo {update.id} not found"
+                    raise ValueError(msg) from key_err
+        self._page_applied = position + 1
+
+    def _apply_decoded(self, result: SyncResult, decoded: DecodedPage) -> None:
+        """Apply a page decoded by a worker, items were validated by the worker."""
+        for update in decoded.updates():
+            self._apply_update(update, validated=True)
+        self._apply_page(result, decoded.page, len(decoded.items))
+
+    def _apply_window(
+        self, result: SyncResult, history: HistoryResponse, end: int
+    ) -> bool:
+        """Apply the items of a page that come before `end`.
+
+        Pages fetched concurrently start at the end of the previous window, so
+        their items can overlap. Returns whether the page ended before `end`
+        and the rest has to be fetched.
+        """
+        item_count = min(len(history.items), end - self._offset)
+        del history.items[item_count:]
+        self._process_history(history)
+        self._apply_page(result, history, item_count, self._offset + item_count)
+        return 0 < item_count and self._offset < end
+
+    def _apply_page(
+        self,
+        result: SyncResult,
+        page: HistoryPage,
+        item_count: int,
+        next_index: int | None = None,
+    ) -> bool:
+        """Advance the offset past an applied page, returns whether to keep going."""
+        self._offset = (
+            page.next_index(self._offset, item_count)
+            if next_index is None
+            else next_index
+        )
+        self._page_applied = self._page_position = 0
+        self._checkpoint.add_page()
+        if self._checkpoint.due:
+            self._save_checkpoint()
+        result.add(page, item_count, self._offset)
+        log.debug("applied history page", offset=self._offset, items=item_count)
+        return page.has_more and item_count > 0
+
+    @staticmethod
+    def _commit_batches(
+        items: Iterable[TodoItem],
+        max_size: int = MAX_COMMIT_SIZE,
+        skip_unchanged: bool = False,
+        skipped: set[str] | None = None,
+    ) -> Iterator[list[tuple[TodoItem, Update]]]:
+        """Group the pending updates of items into batches for a single commit each.
+
+        A batch is closed once its serialized size would exceed `max_size`. An item
+        that is passed more than once is only committed once. The uuids of items
+        left out by `skip_unchanged` are added to `skipped`.
+        """
+        batch: list[tuple[TodoItem, Update]] = []
+        seen: set[str] = set()
+        size = 0
+        for item in items:
+            if item.uuid in seen:
+                continue
+            seen.add(item.uuid)
+            try:
+                update = item.to_update()
+            except ValueError:
+                if skip_unchanged:
+                    log.debug("skipping unchanged item", uuid=item.uuid)
+                    if skipped is not None:
+                        skipped.add(item.uuid)
+                    continue
+                raise
+            update_size = len(json.dumps(update.to_api_payload()))
+            if batch and size + update_size > max_size:
+                yield batch
+                batch, size = [], 0
+            batch.append((item, update))
+            size += update_size
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _commit_payload(batch: list[tuple[TodoItem, Update]]) -> dict[str, Any]:
+        payload: dict[str, Any] = {}
+        for _, update in batch:
+            payload.update(update.to_api_payload())
+        return payload
+
+    def _apply_commit(
+        self, batch: list[tuple[TodoItem, Update]], head_index: int
+    ) -> None:
+        for item, update in batch:
+            item._commit(update.body.payload)
+            self._items[item.uuid] = item
+        self._offset = head_index
+        self._page_applied = 0
+        self._persist()
+
+    def _persist(self) -> None:
+        self._items.offset = self._offset
+        self._items.flush()
+        self._items.sync_pending = False
+
+    def save_snapshot(self, path: str | os.PathLike[str]) -> None:
+        """Save all synced items and the history offset to a snapshot file."""
+        save_snapshot(path, self._history_key, self._offset, self._items.values())
+
+    def load_snapshot(self, path: str | os.PathLike[str]) -> None:
+        """Replace the synced items with those of a snapshot file.
+
+        The next update resumes from the offset the snapshot was taken at.
+        """
+        snapshot = load_snapshot(path)
+        if snapshot.history_key != self._history_key:
+            raise ValueError("snapshot belongs to a different account")
+        self._items.clear()
+        for item in snapshot.items:
+            self._items[item.uuid] = item
+        self._offset = snapshot.offset
+        self._page_applied = 0
+        self._persist()
+        log.debug("loaded snapshot", offset=self._offset, items=len(snapshot.items))
+
+    @property
+    def _history_key(self) -> str:
+        return str(self._account._info.history_key)
+
+    def query(self) -> Query:
+        """Query the synced items, e.g. `client.query().where(project=uuid).all()`."""
+        return self._items.query()
+
+    def today(self) -> list[TodoItem]:
+        return self.query().where(scheduled_date=Util.today().date()).all()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any
+
+import pydantic
+from structlog import get_logger
+
+from things_cloud.api.account import AccountInfo, Credentials, SharedSession
+
+log = get_logger()
+
+DEFAULT_MAX_AGE = 24 * 60 * 60  # seconds
+# cost of the scrypt digest of the credentials, entries with another cost are
+# ignored. A digest takes about 16MB of memory and tens of milliseconds.
+SCRYPT_COST = 2**14
+
+
+class SessionCache:
+    """Account info and shared sessions of logged in accounts, kept in memory.
+
+    Entries expire `max_age` seconds after the login and are only returned for
+    the credentials they were saved with. An account built from the cache
+    logs in again when the server rejects a request.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE) -> None:
+        self.max_age = max_age
+        self._entries: dict[str, dict[str, Any]] | None = None
+
+    def info(self, credentials: Credentials) -> AccountInfo | None:
+        entry = self._entry(credentials)
+        if entry is None:
+            return None
+        return _validate(AccountInfo, entry["info"])
+
+    def session(self, credentials: Credentials) -> SharedSession | None:
+        entry = self._entry(credentials)
+        if entry is None or entry["session"] is None:
+            return None
+        return _validate(SharedSession, entry["session"])
+
+    def put(self, credentials: Credentials, info: AccountInfo) -> None:
+        """Save the account info of a login, replacing a cached session."""
+        salt = os.urandom(16)
+        entries = self._loaded()
+        entries[credentials.email] = {
+            "salt": salt.hex(),
+            "cost": SCRYPT_COST,
+            "digest": _digest(credentials, salt),
+            "saved_at": time.time(),
+            "info": info.model_dump(mode="json", by_alias=True),
+            "session": None,
+        }
+        self._save(entries)
+
+    def put_session(self, credentials: Credentials, session: SharedSession) -> None:
+        entry = self._entry(credentials)
+        if entry is None:
+            return  # only sessions of a cached login are kept
+        entry["session"] = session.model_dump(by_alias=True)
+        self._save(self._loaded())
+
+    def invalidate(self, credentials: Credentials) -> None:
+        entries = self._loaded()
+        if entries.pop(credentials.email, None) is not None:
+            self._save(entries)
+
+    def _entry(self, credentials: Credentials) -> dict[str, Any] | None:
+        entry = self._loaded().get(credentials.email)
+        if entry is None:
+            return None
+        if time.time() - entry["saved_at"] > self.max_age:
+            return None
+        if entry.get("cost") != SCRYPT_COST:
+            return None  # written with another or a fast digest
+        digest = _digest(credentials, bytes.fromhex(entry["salt"]))
+        if not hmac.compare_digest(entry["digest"], digest):
+            return None
+        return entry
+
+    def _loaded(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        return {}
+
+    def _save(self, entries: dict[str, dict[str, Any]]) -> None:
+        pass
+
+
+class FileSessionCache(SessionCache):
+    """`SessionCache` that is kept in a JSON file only readable by its owner.
+
+    The file is not encrypted. It holds the history keys and session secrets
+    of the accounts, and a salted scrypt digest of the credentials that is only
+    slow to brute-force, not impossible. A history key alone grants full read
+    and write access to the history of its account, so anyone who can read the
+    file can read and change every item of the cached accounts.
+    """
+
+    def __init__(
+        self, path: str | os.PathLike[str], max_age: float = DEFAULT_MAX_AGE
+    ) -> None:
+        super().__init__(max_age)
+        self.path = os.fspath(path)
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("ignoring unreadable session cache", path=self.path, error=e)
+            return {}
+
+    def _save(self, entries: dict[str, dict[str, Any]]) -> None:
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def _digest(credentials: Credentials, salt: bytes) -> str:
+    return _scrypt(credentials.as_encoded_payload(), salt)
+
+
+@functools.lru_cache(maxsize=64)
+def _scrypt(payload: str, salt: bytes) -> str:
+    # every lookup of an entry checks its digest, compute it once per process
+    digest = hashlib.scrypt(
+        payload.encode("utf-8"), salt=salt, n=SCRYPT_COST, r=8, p=1, dklen=32
+    )
+    return digest.hex()
+
+
+def _validate[M: pydantic.BaseModel](model: type[M], data: Any) -> M | None:
+    try:
+        return model.model_validate(data)
+    except pydantic.ValidationError:
+        return None  # written by an incompatible version
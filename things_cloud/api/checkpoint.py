@@ -0,0 +1,56 @@
+import os
+import time
+
+
+class Checkpoint:
+    """When a client saves the progress of a sync.
+
+    The store is flushed together with the history offset once `max_pages`
+    pages were applied since the last checkpoint or the first of them was
+    applied `max_delay` seconds ago, and when the sync ends. Only whole pages
+    are saved, a sync that is restarted after the process died continues from
+    the last checkpoint without applying an update twice.
+
+    With `snapshot` the items are also written to that snapshot file at every
+    checkpoint, for stores that do not persist themselves. Load it with
+    `load_snapshot` to resume.
+    """
+
+    def __init__(
+        self,
+        max_pages: int = 1,
+        max_delay: float | None = None,
+        snapshot: str | os.PathLike[str] | None = None,
+    ) -> None:
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.max_pages = max_pages
+        self.max_delay = max_delay
+        self.snapshot = snapshot
+        self._pages = 0
+        self._since: float | None = None
+
+    @property
+    def pending(self) -> int:
+        """Pages applied since the last checkpoint."""
+        return self._pages
+
+    def add_page(self) -> None:
+        if not self._pages:
+            self._since = time.monotonic()
+        self._pages += 1
+
+    @property
+    def due(self) -> bool:
+        if not self._pages:
+            return False
+        if self._pages >= self.max_pages:
+            return True
+        if self.max_delay is None:
+            return False
+        assert self._since is not None
+        return time.monotonic() - self._since >= self.max_delay
+
+    def done(self) -> None:
+        self._pages = 0
+        self._since = None
@@ -1,29 +1,62 @@
-import httpx
-from httpx import HTTPStatusError, Request, RequestError, Response
+import queue
+import threading
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+
+from httpx import RequestError, Response
 from structlog import get_logger
 
 from things_cloud.api.account import Account
-from things_cloud.api.const import API_BASE, HEADERS
+from things_cloud.api.base import STREAM_EXTENSION, BaseClient, SyncResult
+from things_cloud.api.checkpoint import Checkpoint
+from things_cloud.api.const import HEADERS, MAX_COMMIT_SIZE
+from things_cloud.api.decode import (
+    MAX_PENDING_PAGES,
+    DecodedPage,
+    decode_page,
+    read_page,
+)
 from things_cloud.api.exceptions import ThingsCloudException
+from things_cloud.api.queue import CommitQueue
+from things_cloud.api.stream import HistoryStream
+from things_cloud.api.transport import Transport
 from things_cloud.models.todo import (
     CommitResponse,
+    HistoryPage,
     HistoryResponse,
-    NewBody,
     TodoItem,
     Update,
-    UpdateType,
+    batch_edit,
 )
-from things_cloud.utils import Util
+from things_cloud.store import ItemStore
 
 log = get_logger()
 
 
-class ThingsClient:
-    def __init__(self, account: Account) -> None:
-        self._account = account
-        self._items: dict[str, TodoItem] = {}  # TODO: create DB
-        self._base_url: str = f"{API_BASE}/history/{account._info.history_key}"
-        self._client = httpx.Client(
+class ThingsClient(BaseClient):
+    def __init__(
+        self,
+        account: Account,
+        store: ItemStore | None = None,
+        write_behind: CommitQueue | None = None,
+        trusted: bool = False,
+        decode_executor: Executor | None = None,
+        checkpoint: Checkpoint | None = None,
+        transport: Transport | None = None,
+    ) -> None:
+        super().__init__(
+            account,
+            store,
+            write_behind,
+            trusted,
+            decode_executor,
+            checkpoint,
+            transport,
+        )
+        self.__login_lock = threading.Lock()
+        self._client = self._transport.client(
             base_url=self._base_url,
             headers=HEADERS,
             event_hooks={
@@ -31,23 +64,53 @@ class ThingsClient:
                 "response": [self.log_response, self.raise_on_4xx_5xx],
             },
         )
-        self._session = account.new_session()
-        self._offset = self._session.head_index
+
+    def __enter__(self) -> "ThingsClient":
+        self.connect()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
 
     def __del__(self):
+        # never commit from the garbage collector, it may run at shutdown or on
+        # any thread and a failed commit would go unnoticed
+        if self._queue and not self._client.is_closed:
+            log.warning(
+                "dropping items that were never committed", items=len(self._queue)
+            )
+        self.__close_connections()
+
+    def close(self) -> None:
+        """Commit the items queued in write-behind mode, then close the connections."""
+        try:
+            if self._queue and not self._client.is_closed:
+                self.flush()
+        finally:
+            self.__close_connections()
+
+    def __close_connections(self) -> None:
         self._client.close()
+        if self._owns_transport and not self._transport.closed:
+            self._transport.close()
 
-    @staticmethod
-    def log_request(request: Request) -> None:
-        log.debug(f"Request: {request.method} {request.url} - Waiting for response")
+    def connect(self) -> None:
+        """Set up the shared session, done implicitly on first use."""
+        if self._connected:
+            return
+        self._start_session(self._account.new_session(self._transport, self._resuming))
 
-    @staticmethod
-    def raise_on_4xx_5xx(response: Response) -> None:
-        """Raises a HTTPStatusError on 4xx and 5xx responses."""
-        try:
-            response.raise_for_status()
-        except HTTPStatusError as err:
-            raise ThingsCloudException from err
+    @contextmanager
+    def __connecting(self) -> Iterator[None]:
+        """Set up the session, while history is fetched if the store has an offset."""
+        if self._connected or not self._resuming:
+            self.connect()
+            yield
+            return
+        with ThreadPoolExecutor(1, "things-connect") as executor:
+            connecting = executor.submit(self.connect)
+            yield
+            connecting.result()
 
     @staticmethod
     def log_response(response: Response) -> None:
@@ -55,31 +118,320 @@ class ThingsClient:
         log.debug(
             f"Response: {request.method} {request.url}", status=response.status_code
         )
+        if request.extensions.get(STREAM_EXTENSION):
+            return  # body is consumed incrementally by the caller
         response.read()  # access response body
         log.debug("Body", content=response.content)
 
-    def update(self) -> None:
-        data = self.__fetch(self._offset)
-        self._process_history(data)
-        self._offset = data.current_item_index
+    def update(
+        self, stream: bool = False, fetch_ahead: int = 0, concurrency: int = 1
+    ) -> SyncResult:
+        """Fetch and apply history pages until the server head is reached.
+
+        With `stream` each update is applied while the page is still being
+        received instead of after the whole page has been decoded. With
+        `fetch_ahead` up to that many pages are downloaded in the background
+        while the current page is applied. With a `decode_executor` pages are
+        decoded by its workers while the next pages are fetched, they are still
+        applied in order. With `concurrency` the history up to the server head
+        is fetched in windows of one page, that many at a time, see
+        `_apply_window`.
+        """
+        self._begin_update(fetch_ahead, concurrency)
+        if stream and (self._decode_executor is not None or fetch_ahead):
+            raise ValueError(
+                "stream cannot be used with fetch_ahead or a decode executor"
+            )
+        if self._queue and self._queue.due:
+            self.flush()
+        with self.__connecting():
+            result = SyncResult(start_index=self._offset, end_index=self._offset)
+            # a fan-out stops at the head it saw first, the history added since
+            # then is synced in order like without it
+            keep_syncing = concurrency == 1 or self.__update_fan_out(
+                result, concurrency
+            )
+            if keep_syncing:
+                self.__update_in_order(result, stream, fetch_ahead)
+            self._end_update()
+        return result
+
+    def __update_in_order(
+        self, result: SyncResult, stream: bool, fetch_ahead: int
+    ) -> None:
+        if self._decode_executor is not None:
+            self.__update_parallel(result, self._decode_executor)
+        elif fetch_ahead:
+            self.__update_fetch_ahead(result, fetch_ahead)
+        else:
+            self.__update_serial(result, stream)
+
+    def __update_serial(self, result: SyncResult, stream: bool) -> None:
+        while True:
+            if stream:
+                page, item_count = self.__fetch_and_apply(self._offset)
+            else:
+                data = self.__fetch(self._offset)
+                self._process_history(data)
+                page, item_count = data, len(data.items)
+            if not self._apply_page(result, page, item_count):
+                break
+
+    def __update_fan_out(self, result: SyncResult, concurrency: int) -> bool:
+        """Apply the history up to the server head in concurrently fetched windows.
+
+        Returns whether to keep syncing, which is the case unless the first page
+        already reached the head.
+        """
+        first = self.__fetch(self._offset)
+        self._process_history(first)
+        size = len(first.items)
+        if not self._apply_page(result, first, size):
+            return False
+        head = first.current_item_index
+        windows = iter(range(self._offset, head, size))
+        pending: deque[tuple[int, Future[HistoryResponse]]] = deque()
+        with ThreadPoolExecutor(concurrency, "things-fan-out") as executor:
+            try:
+                while True:
+                    while (
+                        len(pending) < concurrency
+                        and (start := next(windows, None)) is not None
+                    ):
+                        pending.append((start, executor.submit(self.__fetch, start)))
+                    if not pending:
+                        return True
+                    start, future = pending.popleft()
+                    end = min(start + size, head)
+                    if not self.__apply_window(result, future.result(), end):
+                        return True
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def __apply_window(
+        self, result: SyncResult, history: HistoryResponse, end: int
+    ) -> bool:
+        """Apply a window and fetch what it is missing, returns whether it is complete."""
+        while self._apply_window(result, history, end):
+            history = self.__fetch(self._offset)
+        return self._offset == end
+
+    def __update_fetch_ahead(self, result: SyncResult, depth: int) -> None:
+        with closing(self.__fetch_ahead(depth)) as pages:
+            for content, page, item_count in pages:
+                self._process_history(HistoryResponse.model_validate_json(content))
+                self._apply_page(result, page, item_count)
+
+    def __fetch_ahead(
+        self, depth: int
+    ) -> Generator[tuple[bytes, HistoryPage, int], None, None]:
+        """Pages from the current offset, fetched by a background thread.
+
+        At most `depth` fetched pages wait to be consumed, the thread stops once
+        the consumer does.
+        """
+        pages: queue.Queue[tuple[bytes, HistoryPage, int] | Exception | None] = (
+            queue.Queue(depth)
+        )
+        stop = threading.Event()
+
+        def fetch() -> None:
+            index = self._offset
+            try:
+                while not stop.is_set():
+                    content = self.__fetch_content(index)
+                    page, item_count = read_page(content)
+                    pages.put((content, page, item_count))
+                    index = page.next_index(index, item_count)
+                    if not page.has_more or item_count == 0:
+                        break
+                pages.put(None)
+            except Exception as e:
+                pages.put(e)
+
+        thread = threading.Thread(target=fetch, name="things-fetch-ahead", daemon=True)
+        thread.start()
+        try:
+            while (entry := pages.get()) is not None:
+                if isinstance(entry, Exception):
+                    raise entry
+                yield entry
+        finally:
+            stop.set()
+            # keep taking pages so the thread is not blocked on a full queue
+            while thread.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+    def __update_parallel(self, result: SyncResult, executor: Executor) -> None:
+        pending: deque[Future[DecodedPage]] = deque()
+        index = self._offset
+        more = True
+        try:
+            while more or pending:
+                if more and len(pending) < MAX_PENDING_PAGES:
+                    content = self.__fetch_content(index)
+                    page, item_count = read_page(content)
+                    pending.append(
+                        executor.submit(decode_page, content, not self._trusted)
+                    )
+                    index = page.next_index(index, item_count)
+                    more = page.has_more and item_count > 0
+                # apply decoded pages in order, wait once there is nothing to fetch
+                while pending and (
+                    pending[0].done() or not more or len(pending) >= MAX_PENDING_PAGES
+                ):
+                    self._apply_decoded(result, pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
 
     def commit(self, item: TodoItem) -> None:
-        update = item.to_update()
+        """Commit an item, or queue it when the client is in write-behind mode."""
+        if self._queue is None:
+            self.commit_many([item])
+            return
+        self._queue.add(item)
+        if self._queue.due:
+            self.flush()
+
+    def commit_many(
+        self,
+        items: Iterable[TodoItem],
+        max_size: int = MAX_COMMIT_SIZE,
+        skip_unchanged: bool = False,
+    ) -> None:
+        """Commit all items with as few requests as possible.
+
+        Updates are sent in batches of at most `max_size` serialized bytes. If a
+        request fails, the items of earlier batches remain committed. Items without
+        changes raise a `ValueError`, unless `skip_unchanged` is set.
+        """
+        self.connect()
+        for batch in self._commit_batches(items, max_size, skip_unchanged):
+            self.__commit_batch(batch)
+
+    @contextmanager
+    def bulk_edit(self, items: Iterable[TodoItem]) -> Iterator[list[TodoItem]]:
+        """Edit items without validating every assignment, then commit them.
+
+        Each item is validated once when the block is left, see `batch_edit`.
+        Changed items are committed together, or queued in write-behind mode.
+        """
+        items = list(items)
+        with batch_edit(items):
+            yield items
+        if self._queue is None:
+            self.commit_many(items, skip_unchanged=True)
+            return
+        for item in items:
+            self.commit(item)
+
+    def flush(self) -> None:
+        """Commit all items queued in write-behind mode.
+
+        Items without changes are skipped; items that could not be committed stay
+        queued for the next flush.
+        """
+        if not self._queue:
+            return
+        self.connect()
+        items = self._queue.drain()
+        done: set[str] = set()  # committed or unchanged
         try:
-            commit = self.__commit(update)
-            item._commit(update.body.payload)
-            self._offset = commit.server_head_index
+            for batch in self._commit_batches(items, skip_unchanged=True, skipped=done):
+                self.__commit_batch(batch)
+                done.update(item.uuid for item, _ in batch)
+        finally:
+            self._queue.restore(item for item in items if item.uuid not in done)
+
+    def __commit_batch(self, batch: list[tuple[TodoItem, Update]]) -> None:
+        try:
+            commit = self.__commit(batch)
+            self._apply_commit(batch, commit.server_head_index)
         except ThingsCloudException as e:
             log.error("Error commiting")
             raise e
 
     def __request(self, method: str, endpoint: str, **kwargs) -> Response:
+        return self.__authorized(self.__send, method, endpoint, **kwargs)
+
+    def __authorized[R](
+        self, send: Callable[..., R], method: str, endpoint: str, **kwargs
+    ) -> R:
+        """Send a request, logging in again once if the cached login was rejected."""
+        logins = self._logins
+        try:
+            return send(method, endpoint, **kwargs)
+        except ThingsCloudException as e:
+            if not self._should_relogin(e):
+                raise
+        self.__relogin(logins)
+        return send(method, endpoint, **kwargs)
+
+    def __relogin(self, logins: int) -> None:
+        """Log in again, unless another thread did since the rejected request was sent.
+
+        Fan-out workers and the fetch-ahead thread can be rejected at the same
+        time, only the first of them logs in.
+        """
+        with self.__login_lock:
+            if self._logins != logins:
+                return
+            log.info("request was not authorized, logging in again")
+            self._account.relogin(self._transport)
+            session = self._account.new_session(self._transport, use_cache=False)
+            self._relogged_in(session)
+            self._client.base_url = self._base_url
+
+    def __send(self, method: str, endpoint: str, **kwargs) -> Response:
         try:
             return self._client.request(method, endpoint, **kwargs)
         except RequestError as e:
             raise ThingsCloudException from e
 
+    @contextmanager
+    def __stream(self, method: str, endpoint: str, **kwargs) -> Iterator[Response]:
+        response = self.__authorized(self.__open_stream, method, endpoint, **kwargs)
+        try:
+            yield response
+        except RequestError as e:
+            raise ThingsCloudException from e
+        finally:
+            response.close()
+
+    def __open_stream(self, method: str, endpoint: str, **kwargs) -> Response:
+        """Send a request without reading its body, close the returned response."""
+        request = self._client.build_request(
+            method, endpoint, extensions={STREAM_EXTENSION: True}, **kwargs
+        )
+        try:
+            return self._client.send(request, stream=True)
+        except RequestError as e:
+            raise ThingsCloudException from e
+
+    def __fetch_and_apply(self, index: int) -> tuple[HistoryPage, int]:
+        with self.__stream(
+            "GET",
+            "/items",
+            params={
+                "start-index": str(index),
+            },
+        ) as response:
+            history = HistoryStream(response.iter_bytes())
+            for update in history:
+                self._apply_update(update)
+        assert history.page
+        return history.page, history.item_count
+
     def __fetch(self, index: int) -> HistoryResponse:
+        return HistoryResponse.model_validate_json(self.__fetch_content(index))
+
+    def __fetch_content(self, index: int) -> bytes:
         response = self.__request(
             "GET",
             "/items",
@@ -88,46 +440,19 @@ class ThingsClient:
             },
         )
         if response.status_code == 200:
-            return HistoryResponse.model_validate_json(response.read())
+            return response.read()
         else:
             log.error("Error getting current index", response=response)
             raise ThingsCloudException
 
-    def _process_history(self, history: HistoryResponse) -> None:
-        for update in history.updates:
-            log.debug("processing update", update=update)
-            match update.body.type:
-                case UpdateType.NEW:
-                    assert isinstance(
-                        update.body, NewBody
-                    )  # HACK: type narrowing does not work
-                    item = update.body.payload.to_todo()
-                    item._uuid = update.id
-                    self._items[item.uuid] = item
-                case UpdateType.EDIT:
-                    try:
-                        item = self._items[update.id]
-                    except KeyError as key_err:
-                        msg = f"todo {id} not found"
-                        raise ValueError(msg) from key_err
-                    update.body.payload.apply_edits(item)
-
-    # HACK: temporary
-    def today(self) -> list[TodoItem]:
-        return [
-            item
-            for _, item in self._items.items()
-            if item.scheduled_date == Util.today()
-        ]
-
-    def __commit(self, update: Update) -> CommitResponse:
+    def __commit(self, batch: list[tuple[TodoItem, Update]]) -> CommitResponse:
         response = self.__request(
             method="POST",
             endpoint="/commit",
             params={
                 "ancestor-index": str(self._offset),
-                "_cnt": "1",
+                "_cnt": str(len(batch)),
             },
-            json=update.to_api_payload(),
+            json=self._commit_payload(batch),
         )
         return CommitResponse.model_validate_json(response.read())
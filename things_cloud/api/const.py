@@ -2,6 +2,8 @@ from things_cloud.api.settings import APP_ID, USER_AGENT
 
 API_BASE = "https://cloud.culturedcode.com/version/1"
 
+MAX_COMMIT_SIZE = 256 * 1024  # bytes of serialized updates per commit request
+
 HEADERS = {
     "Accept": "application/json",
     "Accept-Charset": "UTF-8",
@@ -0,0 +1,95 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, TypedDict
+
+from things_cloud.models.todo import (
+    API_FIELDS_SET,
+    LIST_FIELDS,
+    EditBody,
+    EntityType,
+    HistoryPage,
+    HistoryResponse,
+    NewBody,
+    TodoApiObject,
+    TodoDeltaApiObject,
+    Update,
+    UpdateType,
+    construct_model,
+    intern_strings,
+)
+
+# pages that are decoded at the same time, beyond that fetching waits
+MAX_PENDING_PAGES = 8
+
+
+class _Item(TypedDict):
+    pass  # the content of items is skipped, they are only counted
+
+
+class _PageItems(HistoryPage):
+    items: list[_Item]
+
+
+def read_page(content: bytes) -> tuple[HistoryPage, int]:
+    """Metadata and item count of a page, without decoding its items."""
+    page = _PageItems.model_validate_json(content)
+    return page, len(page.items)
+
+
+@dataclass(frozen=True, slots=True)
+class DecodedPage:
+    """History page decoded by `decode_page`.
+
+    Updates are kept as plain field values, which are much cheaper to send
+    between processes than the models they are built from.
+    """
+
+    page: HistoryPage
+    items: list[tuple[str, UpdateType, EntityType, dict[str, Any]]]
+
+    def updates(self) -> Iterator[Update]:
+        """Updates of the page, built without validating them again."""
+        for uuid, kind, entity, values in self.items:
+            # values copied from another process no longer share equal values
+            for name in LIST_FIELDS.intersection(values):
+                intern_strings(values[name])
+            if kind is UpdateType.NEW:
+                payload = construct_model(
+                    TodoApiObject, values, fields_set=API_FIELDS_SET
+                )
+                body = construct_model(
+                    NewBody, {"type": kind, "payload": payload, "entity": entity}
+                )
+            else:
+                delta = TodoDeltaApiObject.model_construct(**values)
+                body = construct_model(
+                    EditBody, {"type": kind, "payload": delta, "entity": entity}
+                )
+            yield construct_model(Update, {"id": uuid, "body": body})
+
+
+def decode_page(content: bytes, validate_items: bool = True) -> DecodedPage:
+    """Decode and validate a history page, meant to run in a worker.
+
+    With `validate_items` new items are also validated the way
+    `TodoApiObject.to_todo` does, so they can be built without validation when
+    the page is applied.
+    """
+    history = HistoryResponse.model_validate_json(content)
+    items: list[tuple[str, UpdateType, EntityType, dict[str, Any]]] = []
+    for update in history.updates:
+        body = update.body
+        if isinstance(body, NewBody):
+            if validate_items:
+                body.payload.to_todo()
+            values = vars(body.payload)
+        else:
+            values = {
+                name: getattr(body.payload, name)
+                for name in body.payload.model_fields_set
+            }
+        items.append((update.id, body.type, body.entity, values))
+    page = construct_model(
+        HistoryPage, {name: getattr(history, name) for name in HistoryPage.model_fields}
+    )
+    return DecodedPage(page, items)
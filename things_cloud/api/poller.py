@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+from structlog import get_logger
+
+from things_cloud.api.async_client import AsyncThingsClient
+from things_cloud.api.base import SyncResult
+from things_cloud.api.client import ThingsClient
+from things_cloud.models.todo import TodoItem
+
+log = get_logger()
+
+
+class Backoff:
+    """Poll interval that grows while the history does not change.
+
+    The interval starts at `min_interval`, is multiplied by `factor` after
+    every poll without changes up to `max_interval`, and drops back to
+    `min_interval` once something changed.
+    """
+
+    def __init__(
+        self, min_interval: float = 2.0, max_interval: float = 60.0, factor: float = 2.0
+    ) -> None:
+        if min_interval <= 0:
+            raise ValueError("min_interval must be positive")
+        if max_interval < min_interval:
+            raise ValueError("max_interval must not be less than min_interval")
+        if factor < 1:
+            raise ValueError("factor must be at least 1")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.interval = min_interval
+
+    def changed(self) -> None:
+        self.interval = self.min_interval
+
+    def unchanged(self) -> None:
+        self.interval = min(self.interval * self.factor, self.max_interval)
+
+
+@dataclass
+class PollStats:
+    """Freshness of the items of a polled client."""
+
+    polls: int = 0
+    empty_polls: int = 0  # polls that found no new history items
+    errors: int = 0
+    last_poll_at: float | None = None  # `time.monotonic()` of the last successful poll
+    last_change_at: float | None = None  # of the last poll that applied items
+    last_error: Exception | None = None
+    lag_items: int | None = None  # history items the last poll ended behind
+
+    @property
+    def staleness(self) -> float | None:
+        """Seconds since the items were last known to be up to date."""
+        if self.last_poll_at is None:
+            return None
+        return time.monotonic() - self.last_poll_at
+
+
+class _BasePoller:
+    def __init__(self, backoff: Backoff | None) -> None:
+        self.backoff = backoff if backoff is not None else Backoff()
+        self.stats = PollStats()
+        self._started_at = time.monotonic()
+        self._stopping = False
+
+    def _record(self, result: SyncResult) -> None:
+        now = time.monotonic()
+        stats = self.stats
+        stats.polls += 1
+        stats.last_poll_at = now
+        stats.lag_items = result.lag
+        if result.items:
+            stats.last_change_at = now
+            self.backoff.changed()
+        else:
+            stats.empty_polls += 1
+            self.backoff.unchanged()
+
+    def _record_error(self, err: Exception) -> None:
+        log.warning("poll failed", error=err)
+        self.stats.errors += 1
+        self.stats.last_error = err
+        self.backoff.unchanged()
+
+    def _due_in(self) -> float:
+        return self._started_at + self.backoff.interval - time.monotonic()
+
+
+class Poller(_BasePoller):
+    """Keeps a `ThingsClient` up to date from a background thread.
+
+    History is polled from the offset of the client, at an interval set by
+    `backoff`. Commit through the poller while it runs, the client must not be
+    used from several threads at once. A commit or `notify` drops the
+    interval to its minimum, since more changes are likely to follow.
+    """
+
+    def __init__(self, client: ThingsClient, backoff: Backoff | None = None) -> None:
+        super().__init__(backoff)
+        self._client = client
+        self._lock = threading.Lock()
+        self._activity = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Poller:
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            raise RuntimeError("poller is already running")
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="things-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop polling, a poll in progress is finished first."""
+        self._stopping = True
+        self._activity.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self) -> None:
+        """Poll at the shortest interval again, e.g. after activity elsewhere."""
+        self.backoff.changed()
+        self._activity.set()
+
+    def commit(self, item: TodoItem) -> None:
+        with self._lock:
+            self._client.commit(item)
+        self.notify()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._poll()
+            self._wait()
+
+    def _poll(self) -> None:
+        self._started_at = time.monotonic()
+        with self._lock:
+            try:
+                result = self._client.update()
+            except Exception as e:
+                self._record_error(e)
+                return
+        self._record(result)
+
+    def _wait(self) -> None:
+        while not self._stopping and (remaining := self._due_in()) > 0:
+            self._activity.wait(remaining)
+            self._activity.clear()
+
+
+class AsyncPoller(_BasePoller):
+    """Keeps an `AsyncThingsClient` up to date from a task, see `Poller`."""
+
+    def __init__(
+        self, client: AsyncThingsClient, backoff: Backoff | None = None
+    ) -> None:
+        super().__init__(backoff)
+        self._client = client
+        self._lock = asyncio.Lock()
+        self._activity = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> AsyncPoller:
+        self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling in a task of the running event loop."""
+        if self.running:
+            raise RuntimeError("poller is already running")
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling, a poll in progress is finished first."""
+        self._stopping = True
+        self._activity.set()
+        if self._task is not None:
+            await self._task
+
+    def notify(self) -> None:
+        """Poll at the shortest interval again, e.g. after activity elsewhere."""
+        self.backoff.changed()
+        self._activity.set()
+
+    async def commit(self, item: TodoItem) -> None:
+        async with self._lock:
+            await self._client.commit(item)
+        self.notify()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._poll()
+            await self._wait()
+
+    async def _poll(self) -> None:
+        self._started_at = time.monotonic()
+        async with self._lock:
+            try:
+                result = await self._client.update()
+            except Exception as e:
+                self._record_error(e)
+                return
+        self._record(result)
+
+    async def _wait(self) -> None:
+        while not self._stopping and (remaining := self._due_in()) > 0:
+            try:
+                await asyncio.wait_for(self._activity.wait(), remaining)
+            except TimeoutError:
+                return
+            finally:
+                self._activity.clear()
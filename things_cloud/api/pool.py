@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from structlog import get_logger
+
+from things_cloud.api.account import Account
+from things_cloud.api.async_client import AsyncThingsClient
+from things_cloud.api.base import SyncResult
+from things_cloud.api.transport import Transport
+from things_cloud.models.todo import TodoItem
+
+log = get_logger()
+
+
+@dataclass
+class SyncStatus:
+    """Outcome of the syncs of an account in a `ThingsClientPool`."""
+
+    result: SyncResult | None = None  # of the last successful sync
+    synced_at: float | None = None  # `time.monotonic()` of the last successful sync
+    error: Exception | None = None  # of the last sync, if it failed
+
+    @property
+    def lag_items(self) -> int | None:
+        """History items the last successful sync was behind the server head."""
+        return self.result.lag if self.result is not None else None
+
+    @property
+    def lag_seconds(self) -> float | None:
+        """Seconds since the last successful sync."""
+        if self.synced_at is None:
+            return None
+        return time.monotonic() - self.synced_at
+
+
+@dataclass
+class _Member:
+    account: Account
+    client: AsyncThingsClient
+    limit: asyncio.Semaphore
+    status: SyncStatus = field(default_factory=SyncStatus)
+
+
+class ThingsClientPool:
+    """Syncs many accounts from one event loop over shared connections.
+
+    Every account gets an `AsyncThingsClient` that uses the pooled connections
+    of `transport`. At most `max_concurrency` operations run at the same time
+    across all accounts and `max_per_account` for a single account, the others
+    wait for a free slot instead of opening more connections.
+    """
+
+    def __init__(
+        self,
+        transport: Transport | None = None,
+        max_concurrency: int = 16,
+        max_per_account: int = 1,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_per_account < 1:
+            raise ValueError("max_per_account must be at least 1")
+        self._owns_transport = transport is None
+        self._transport = transport or Transport()
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._max_per_account = max_per_account
+        self._members: dict[str, _Member] = {}
+
+    async def __aenter__(self) -> ThingsClientPool:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.aclose()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, account: Account) -> bool:
+        return account.history_key in self._members
+
+    def __iter__(self) -> Iterator[AsyncThingsClient]:
+        return (member.client for member in self._members.values())
+
+    def add(self, account: Account, **options: Any) -> AsyncThingsClient:
+        """Create the client of an account, `options` are passed to the client.
+
+        No I/O is done, the session is set up by the first operation.
+        """
+        key = account.history_key
+        if key in self._members:
+            raise ValueError(f"account {key} was already added")
+        client = AsyncThingsClient(account, transport=self._transport, **options)
+        self._members[key] = _Member(
+            account, client, asyncio.Semaphore(self._max_per_account)
+        )
+        return client
+
+    async def remove(self, account: Account) -> None:
+        member = self._members.pop(account.history_key)
+        await member.client.aclose()
+
+    def client(self, account: Account) -> AsyncThingsClient:
+        return self._members[account.history_key].client
+
+    def status(self, account: Account) -> SyncStatus:
+        return self._members[account.history_key].status
+
+    def lag(self) -> dict[str, float | None]:
+        """Seconds since the last successful sync of each account."""
+        return {key: member.status.lag_seconds for key, member in self._members.items()}
+
+    async def update(self, account: Account, **options: Any) -> SyncResult:
+        """Sync an account once a slot is free, `options` are passed to `update`."""
+        member = self._members[account.history_key]
+        async with member.limit, self._limit:
+            try:
+                result = await member.client.update(**options)
+            except Exception as e:
+                member.status.error = e
+                raise
+        member.status = SyncStatus(result=result, synced_at=time.monotonic())
+        return result
+
+    async def update_all(self, **options: Any) -> dict[str, SyncResult | Exception]:
+        """Sync all accounts, a failed sync does not stop the others.
+
+        Returns the result or the error of each account.
+        """
+        members = dict(self._members)
+        outcomes = await asyncio.gather(
+            *(self.update(member.account, **options) for member in members.values()),
+            return_exceptions=True,
+        )
+        results: dict[str, SyncResult | Exception] = {}
+        for key, outcome in zip(members, outcomes, strict=True):
+            if isinstance(outcome, BaseException) and not isinstance(
+                outcome, Exception
+            ):
+                raise outcome  # cancellation and interrupts are not sync errors
+            if isinstance(outcome, Exception):
+                log.warning("sync failed", account=key, error=outcome)
+            results[key] = outcome
+        return results
+
+    async def commit(self, account: Account, item: TodoItem) -> None:
+        member = self._members[account.history_key]
+        async with member.limit, self._limit:
+            await member.client.commit(item)
+
+    async def aclose(self) -> None:
+        """Close the clients, and the transport unless it was passed in."""
+        members = list(self._members.values())
+        self._members.clear()
+        for member in members:
+            await member.client.aclose()
+        if self._owns_transport:
+            await self._transport.aclose()
@@ -0,0 +1,53 @@
+import time
+from collections.abc import Iterable
+
+from things_cloud.models.todo import TodoItem
+
+
+class CommitQueue:
+    """Items waiting to be committed by a client in write-behind mode.
+
+    Each uuid is queued once, so repeated edits of an item end up in a single
+    update that is computed when the queue is flushed. The queue is due once it
+    holds `max_items` items or its oldest entry has waited `max_delay` seconds.
+    """
+
+    def __init__(self, max_items: int = 100, max_delay: float = 5.0) -> None:
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self._pending: dict[str, TodoItem] = {}
+        self._since: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, item: TodoItem) -> bool:
+        return item.uuid in self._pending
+
+    def add(self, item: TodoItem) -> None:
+        if not self._pending:
+            self._since = time.monotonic()
+        self._pending[item.uuid] = item
+
+    @property
+    def due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_items:
+            return True
+        assert self._since is not None
+        return time.monotonic() - self._since >= self.max_delay
+
+    def drain(self) -> list[TodoItem]:
+        items = list(self._pending.values())
+        self._pending.clear()
+        self._since = None
+        return items
+
+    def restore(self, items: Iterable[TodoItem]) -> None:
+        """Put back items that could not be committed, ahead of newer entries."""
+        pending = self._pending
+        self._pending = {}
+        for item in items:
+            self.add(item)
+        self._pending.update(pending)
@@ -0,0 +1,119 @@
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from things_cloud.models.todo import HistoryPage, Update
+
+WHITESPACE = " \t\n\r"
+COMPACT_THRESHOLD = 64 * 1024  # drop consumed input once this many chars were read
+
+
+class _Reader:
+    """Incrementally decodes JSON values from a stream of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        if self._pos > COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._buffer += self._utf8.decode(b"", final=True)
+            self._eof = True
+        else:
+            self._buffer += self._utf8.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it, empty at the end."""
+        while True:
+            while self._pos < len(self._buffer):
+                char = self._buffer[self._pos]
+                if char not in WHITESPACE:
+                    return char
+                self._pos += 1
+            if not self._fill():
+                return ""
+
+    def expect(self, *chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            msg = f"expected one of {chars!r} at offset {self._pos}, got {char!r}"
+            raise ValueError(msg)
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number or literal at the end of the buffer might continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+class HistoryStream:
+    """Decodes a history page while it is being received.
+
+    Iterating yields each `Update` as soon as it has been read from the
+    `items` array, so only a single item is held in memory at a time. The page
+    metadata is available as `page` once iteration has finished.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._reader = _Reader(chunks)
+        self.page: HistoryPage | None = None
+        self.item_count = 0
+
+    def __iter__(self) -> Iterator[Update]:
+        reader = self._reader
+        meta: dict[str, Any] = {}
+        reader.expect("{")
+        if reader.peek() == "}":
+            reader.expect("}")
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                if key == "items":
+                    yield from self._items()
+                else:
+                    meta[key] = reader.value()
+                if reader.expect(",", "}") == "}":
+                    break
+        self.page = HistoryPage.model_validate(meta)
+
+    def _items(self) -> Iterator[Update]:
+        reader = self._reader
+        reader.expect("[")
+        if reader.peek() == "]":
+            reader.expect("]")
+            return
+        while True:
+            item = reader.value()
+            assert (
+                isinstance(item, dict) and len(item) == 1
+            ), "Expected items dict with one key-value pair"
+            key, value = next(iter(item.items()))
+            self.item_count += 1
+            yield Update(id=key, body=value)
+            if reader.expect(",", "]") == "]":
+                return
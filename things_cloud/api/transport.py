@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import ipaddress
+import urllib.request
+from typing import Any
+
+import httpx
+
+# large history pages take longer than the httpx default of five seconds
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0
+)
+
+
+class _SharedTransport(httpx.BaseTransport):
+    """Sends the requests of a client over a pool that outlives the client."""
+
+    def __init__(self, pool: httpx.HTTPTransport) -> None:
+        self._pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._pool.handle_request(request)
+
+    def close(self) -> None:
+        pass  # the pool is closed by its `Transport`
+
+
+class _AsyncSharedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, pool: httpx.AsyncHTTPTransport) -> None:
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class Transport:
+    """Pooled keep-alive connections shared by accounts and clients.
+
+    Clients created with `client` and `async_client` send their requests over
+    the same connections, closing them leaves the pool open. Close the
+    transport once it is no longer used, or use it as a context manager.
+    `http2` requires the `h2` package, install `httpx[http2]`.
+
+    Requests go through `proxy` if it is set, otherwise with `trust_env`
+    through the proxies of the `HTTP_PROXY`, `HTTPS_PROXY`, `ALL_PROXY` and
+    `NO_PROXY` environment variables, like a plain `httpx.Client`.
+    """
+
+    def __init__(
+        self,
+        http2: bool = False,
+        timeout: httpx.Timeout = TIMEOUT,
+        limits: httpx.Limits = LIMITS,
+        proxy: str | None = None,
+        trust_env: bool = True,
+    ) -> None:
+        self.timeout = timeout
+        self._pool = httpx.HTTPTransport(http2=http2, limits=limits)
+        self._async_pool = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+        if proxy is not None:
+            proxies: dict[str, str | None] = {"all://": proxy}
+        else:
+            proxies = _environment_proxies() if trust_env else {}
+        # pools of the proxied requests by URL pattern, None sends them directly
+        self._proxy_pools = {
+            pattern: None
+            if url is None
+            else httpx.HTTPTransport(http2=http2, limits=limits, proxy=url)
+            for pattern, url in proxies.items()
+        }
+        self._async_proxy_pools = {
+            pattern: None
+            if url is None
+            else httpx.AsyncHTTPTransport(http2=http2, limits=limits, proxy=url)
+            for pattern, url in proxies.items()
+        }
+        self._closed = False
+
+    def __enter__(self) -> Transport:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    async def __aenter__(self) -> Transport:
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.aclose()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def client(self, **kwargs: Any) -> httpx.Client:
+        """Client that sends its requests over the pooled connections."""
+        self._check_open()
+        return httpx.Client(
+            transport=_SharedTransport(self._pool),
+            mounts={
+                pattern: None if pool is None else _SharedTransport(pool)
+                for pattern, pool in self._proxy_pools.items()
+            },
+            timeout=self.timeout,
+            **kwargs,
+        )
+
+    def async_client(self, **kwargs: Any) -> httpx.AsyncClient:
+        self._check_open()
+        return httpx.AsyncClient(
+            transport=_AsyncSharedTransport(self._async_pool),
+            mounts={
+                pattern: None if pool is None else _AsyncSharedTransport(pool)
+                for pattern, pool in self._async_proxy_pools.items()
+            },
+            timeout=self.timeout,
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        """Close the pooled connections of sync clients."""
+        self._closed = True
+        self._pool.close()
+        for pool in self._proxy_pools.values():
+            if pool is not None:
+                pool.close()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of sync and async clients."""
+        self.close()
+        await self._async_pool.aclose()
+        for pool in self._async_proxy_pools.values():
+            if pool is not None:
+                await pool.aclose()
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("transport is closed")
+
+
+def _environment_proxies() -> dict[str, str | None]:
+    """Proxy of each URL pattern set by the environment, the way httpx reads it.
+
+    httpx only reads the environment for clients without a transport, pooled
+    clients have to be given the proxies.
+    """
+    settings = urllib.request.getproxies()
+    proxies: dict[str, str | None] = {}
+    for scheme in ("http", "https", "all"):
+        if url := settings.get(scheme):
+            proxies[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+    for host in (host.strip() for host in settings.get("no", "").split(",")):
+        if host == "*":
+            return {}
+        if not host:
+            continue
+        # see https://curl.se/libcurl/c/CURLOPT_NOPROXY.html
+        if "://" in host:
+            proxies[host] = None
+        elif host.lower() == "localhost":
+            proxies[f"all://{host}"] = None
+        else:
+            try:
+                network = ipaddress.ip_network(host, strict=False)
+            except ValueError:
+                proxies[f"all://*{host}"] = None
+            else:
+                bracketed = f"[{host}]" if network.version == 6 else host
+                proxies[f"all://{bracketed}"] = None
+    return proxies
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from collections.abc import Iterator
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 from datetime import datetime, time
 from enum import IntEnum, StrEnum
-from typing import Annotated, Any, Literal
+from typing import Annotated, Any, Literal, TypedDict, cast
 
 import pydantic
 
@@ -17,13 +19,48 @@ from things_cloud.models.types import (
 from things_cloud.utils import Util
 
 
+def construct_model[M: pydantic.BaseModel](
+    model: type[M],
+    values: dict[str, Any],
+    fields_set: set[str] | None = None,
+    private: dict[str, Any] | None = None,
+) -> M:
+    """Create a model from values that are known to be valid.
+
+    Unlike `model_construct` no defaults are applied, `values` has to contain
+    every field of the model. Private attributes not given in `private` are set
+    to their (immutable) defaults or the result of their default factory.
+    """
+    obj = model.__new__(model)
+    object.__setattr__(obj, "__dict__", values)
+    object.__setattr__(
+        obj,
+        "__pydantic_fields_set__",
+        set(values) if fields_set is None else fields_set,
+    )
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    if model.__private_attributes__:
+        private = dict(private) if private else {}
+        for name, attr in model.__private_attributes__.items():
+            if name not in private:
+                if attr.default_factory is None:
+                    private[name] = attr.default
+                else:
+                    factory = cast(Callable[[], Any], attr.default_factory)
+                    private[name] = factory()
+    object.__setattr__(obj, "__pydantic_private__", private or None)
+    return obj
+
+
 class CommitResponse(pydantic.BaseModel):
     server_head_index: Annotated[
         pydantic.PositiveInt, pydantic.Field(alias="server-head-index")
     ]
 
 
-class HistoryResponse(pydantic.BaseModel):
+class HistoryPage(pydantic.BaseModel):
+    """Metadata of a page of history items."""
+
     current_item_index: Annotated[
         pydantic.PositiveInt, pydantic.Field(alias="current-item-index")
     ]
@@ -37,7 +74,25 @@ class HistoryResponse(pydantic.BaseModel):
     start_total_content_size: Annotated[
         pydantic.PositiveInt, pydantic.Field(alias="start-total-content-size")
     ]
-    items: Annotated[list[dict[str, Body]], pydantic.Field(min_length=1)]
+
+    @property
+    def has_more(self) -> bool:
+        """Whether the server holds history beyond this page."""
+        return self.end_total_content_size < self.latest_total_content_size
+
+    @property
+    def content_size(self) -> int:
+        return self.end_total_content_size - self.start_total_content_size
+
+    def next_index(self, start_index: int, item_count: int) -> int:
+        """History index to request after this page was fetched from `start_index`."""
+        if self.has_more:
+            return start_index + item_count
+        return self.current_item_index
+
+
+class HistoryResponse(HistoryPage):
+    items: list[dict[ShortUUID, Body]]  # empty when already at the server head
 
     @property
     def updates(self) -> Iterator[Update]:
@@ -46,7 +101,8 @@ class HistoryResponse(pydantic.BaseModel):
                 isinstance(item, dict) and len(item) == 1
             ), "Expected items dict with one key-value pair"
             key, value = next(iter(item.items()))
-            yield Update(id=key, body=value)
+            # both parts were validated with the page
+            yield construct_model(Update, {"id": key, "body": value})
 
 
 class Update(pydantic.BaseModel):
@@ -118,18 +174,45 @@ class Status(IntEnum):
     COMPLETE = 3
 
 
-class Note(pydantic.BaseModel):
+class _SharedFieldsSet(pydantic.BaseModel):
+    @pydantic.model_validator(mode="after")
+    def _share_fields_set(self) -> Any:
+        # received with every field, share one set of names like TodoApiObject
+        fields_set = FULL_FIELDS_SETS[type(self)]
+        if self.__pydantic_fields_set__ == fields_set:
+            object.__setattr__(self, "__pydantic_fields_set__", fields_set)
+        return self
+
+
+class Note(_SharedFieldsSet):
     t_: Annotated[str, pydantic.Field(alias="_t")] = "tx"
     ch: int = 0
     value: Annotated[str, pydantic.Field(alias="v")] = ""  # value
     t: int = 1
 
 
-class XX(pydantic.BaseModel):
+class XX(_SharedFieldsSet):
     sn: dict = {}
     t_: Annotated[str, pydantic.Field(alias="_t")] = "oo"
 
 
+FULL_FIELDS_SETS: dict[type[pydantic.BaseModel], set[str]] = {
+    model: set(model.model_fields) for model in (Note, XX)
+}
+
+
+def intern_strings(values: list[Any] | None) -> list[Any] | None:
+    """Share equal strings, e.g. the uuid of a project referenced by many items."""
+    if values is not None:
+        for position, value in enumerate(values):
+            if type(value) is str:
+                values[position] = sys.intern(value)
+    return values
+
+
+InternedStrings = pydantic.AfterValidator(intern_strings)
+
+
 class TodoApiObject(pydantic.BaseModel):
     model_config = pydantic.ConfigDict(populate_by_name=True)
 
@@ -147,10 +230,10 @@ class TodoApiObject(pydantic.BaseModel):
     due_date: Annotated[TimestampInt | None, pydantic.Field(alias="dd")]
     trashed: Annotated[bool, pydantic.Field(alias="tr")]
     instance_creation_paused: Annotated[bool, pydantic.Field(alias="icp")]
-    projects: Annotated[list[str], pydantic.Field(alias="pr")]
-    areas: Annotated[list[str], pydantic.Field(alias="ar")]
+    projects: Annotated[list[str], InternedStrings, pydantic.Field(alias="pr")]
+    areas: Annotated[list[str], InternedStrings, pydantic.Field(alias="ar")]
     evening: Annotated[BoolBit, pydantic.Field(alias="sb")]
-    tags: Annotated[list[Any], pydantic.Field(alias="tg")]
+    tags: Annotated[list[Any], InternedStrings, pydantic.Field(alias="tg")]
     type: Annotated[Type, pydantic.Field(alias="tp")]
     due_date_suppression_date: Annotated[
         TimestampInt | None, pydantic.Field(alias="dds")
@@ -188,8 +271,19 @@ class TodoApiObject(pydantic.BaseModel):
     #     ),
     # ] = None  # exclude otherwise
 
-    def to_todo(self) -> TodoItem:
-        todo = TodoItem(
+    @pydantic.model_validator(mode="after")
+    def _share_fields_set(self) -> TodoApiObject:
+        # every field is required, so all objects can share one set of names
+        object.__setattr__(self, "__pydantic_fields_set__", API_FIELDS_SET)
+        return self
+
+    def to_todo(self, validate: bool = True, uuid: str | None = None) -> TodoItem:
+        """Create a todo item with this object as its synced state.
+
+        Without `validate` the item is constructed directly from the already
+        parsed values, which is considerably faster for trusted data.
+        """
+        fields: dict[str, Any] = dict(
             index=self.index,
             title=self.title,
             creation_date=self.creation_date,
@@ -217,15 +311,54 @@ class TodoApiObject(pydantic.BaseModel):
             after_completion_reference_date=self.after_completion_reference_date,
             recurrence_rule=self.recurrence_rule,
             note=self.note,
+            xx=self.xx,
+        )
+        if validate:
+            todo = TodoItem(**fields)
+            object.__setattr__(todo, "__pydantic_fields_set__", ITEM_FIELDS_SET)
+            if uuid is not None:
+                todo._uuid = uuid
+            todo._status = self.status
+            todo._destination = self.destination
+            todo._projects = self.projects
+            todo._areas = self.areas
+            todo._evening = self.evening
+            todo._type = self.type
+            todo._baseline = self._baseline_copies()
+            return todo
+
+        # validation would copy lists, keep them separate from the synced state
+        for key, value in fields.items():
+            if isinstance(value, list):
+                fields[key] = list(value)
+        return construct_model(
+            TodoItem,
+            fields,
+            fields_set=ITEM_FIELDS_SET,
+            private={
+                "_uuid": Util.uuid() if uuid is None else uuid,
+                "_status": self.status,
+                "_destination": self.destination,
+                "_projects": self.projects,
+                "_areas": self.areas,
+                "_evening": self.evening,
+                "_type": self.type,
+                "_baseline": self._baseline_copies(),
+            },
         )
-        todo._status = self.status
-        todo._destination = self.destination
-        todo._projects = self.projects
-        todo._areas = self.areas
-        todo._evening = self.evening
-        todo._type = self.type
-        todo._synced_state = self
-        return todo
+
+    def _baseline_copies(self) -> dict[str, Any]:
+        """Baseline of an item that is in this state, see `TodoItem._baseline`."""
+        baseline = {
+            name: tuple(value)
+            for name, value in vars(self).items()
+            if type(value) is list and (value or name not in LIST_FIELDS)
+        }
+        for name in MODEL_FIELDS:
+            value = getattr(self, name)
+            if value != EMPTY_MODELS[name]:
+                baseline[name] = value.model_copy(deep=True)
+        return baseline
 
 
 class TodoDeltaApiObject(pydantic.BaseModel):
@@ -247,10 +380,16 @@ class TodoDeltaApiObject(pydantic.BaseModel):
     due_date: Annotated[TimestampInt | None, pydantic.Field(alias="dd")] = None
     trashed: Annotated[bool | None, pydantic.Field(alias="tr")] = None
     instance_creation_paused: Annotated[bool | None, pydantic.Field(alias="icp")] = None
-    projects: Annotated[list[str] | None, pydantic.Field(alias="pr")] = None
-    areas: Annotated[list[str] | None, pydantic.Field(alias="ar")] = None
+    projects: Annotated[
+        list[str] | None, InternedStrings, pydantic.Field(alias="pr")
+    ] = None
+    areas: Annotated[list[str] | None, InternedStrings, pydantic.Field(alias="ar")] = (
+        None
+    )
     evening: Annotated[BoolBit | None, pydantic.Field(alias="sb")] = None
-    tags: Annotated[list[Any] | None, pydantic.Field(alias="tg")] = None
+    tags: Annotated[list[Any] | None, InternedStrings, pydantic.Field(alias="tg")] = (
+        None
+    )
     type: Annotated[Type | None, pydantic.Field(alias="tp")] = None
     due_date_suppression_date: Annotated[
         TimestampInt | None, pydantic.Field(alias="dds")
@@ -278,8 +417,20 @@ class TodoDeltaApiObject(pydantic.BaseModel):
     note: Annotated[Note | None, pydantic.Field(alias="nt")] = None
     xx: Annotated[XX | None, pydantic.Field(alias="xx")] = None
 
+    def edited_fields(self) -> list[str]:
+        """Names of the fields with a value, in field order.
+
+        Same as the keys of `model_dump(exclude_none=True)`, without dumping.
+        """
+        keys = self.model_fields_set | {"modification_date"}
+        return sorted(
+            (key for key in keys if getattr(self, key) is not None),
+            key=DELTA_FIELD_ORDER.__getitem__,
+        )
+
     def apply_edits(self, todo: TodoItem) -> None:
-        keys = self.model_dump(by_alias=False, exclude_none=True).keys()
+        """Apply edits received from the server to the item and its synced state."""
+        keys = self.edited_fields()
         if not keys:
             raise RuntimeError("there are no edits to apply")
         for key in keys:
@@ -289,6 +440,8 @@ class TodoDeltaApiObject(pydantic.BaseModel):
                 msg = f"old and new value are identical: {new_value}"
                 raise ValueError(msg)
             setattr(todo, key, new_value)
+        if todo._baseline is not None:
+            todo._commit(self)
 
 
 class TodoItem(pydantic.BaseModel):
@@ -331,10 +484,74 @@ class TodoItem(pydantic.BaseModel):
     recurrence_rule: str | None = pydantic.Field(default=None)  # TODO: weird XML values
     note: Note = pydantic.Field(default_factory=Note)
     xx: XX = pydantic.Field(default_factory=XX)
-    _synced_state: TodoApiObject | None = pydantic.PrivateAttr(default=None)
+    # synced values of the fields that were changed since the last sync, None if
+    # the item was never synced. Fields that can be modified in place are always
+    # kept, as tuples for lists and copies for notes, unless they were synced empty.
+    _baseline: dict[str, Any] | None = pydantic.PrivateAttr(default=None)
+    # previous values of the fields assigned during a batch edit, and of the
+    # synced attributes changed by setters like `complete`
+    _batch: dict[str, Any] | None = pydantic.PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # read private state directly, attribute access goes through __getattr__
+        private = self.__pydantic_private__
+        assert private is not None
+        key = COPY_ON_WRITE.get(name)
+        if key is not None:
+            baseline = private["_baseline"]
+            if baseline is not None and key not in baseline:
+                baseline[key] = private[name] if name in private else vars(self)[name]
+        if name in SYNCED_PRIVATE_ATTRS:
+            batch = private["_batch"]
+            if batch is not None and name not in batch:
+                batch[name] = private[name]
+        elif name in EDIT_FIELDS:
+            batch = private["_batch"]
+            if batch is not None and name in ITEM_FIELDS:
+                # validated when the batch edit ends
+                values = vars(self)
+                if name not in batch:
+                    batch[name] = values[name]
+                values[name] = value
+                self.__pydantic_fields_set__.add(name)
+                return
+        super().__setattr__(name, value)
+
+    def batch_edit(self) -> AbstractContextManager[None]:
+        """Assign fields without validation until the block is left, see `batch_edit`."""
+        return batch_edit([self])
+
+    def _begin_batch(self) -> None:
+        assert self.__pydantic_private__ is not None
+        if self.__pydantic_private__["_batch"] is not None:
+            raise RuntimeError("item is already part of a batch edit")
+        self.__pydantic_private__["_batch"] = {}
+
+    def _validate_batch(self) -> None:
+        assert self.__pydantic_private__ is not None
+        if batch := self.__pydantic_private__["_batch"]:
+            values = vars(self)
+            values.update(
+                PARTIAL_ITEM.validate_python(
+                    {name: values[name] for name in batch if name in ITEM_FIELDS}
+                )
+            )
+
+    def _end_batch(self, restore: bool) -> None:
+        private = self.__pydantic_private__
+        assert private is not None
+        if restore:
+            for name, value in private["_batch"].items():
+                if name in SYNCED_PRIVATE_ATTRS:
+                    private[name] = value
+                else:
+                    vars(self)[name] = value
+        private["_batch"] = None
 
     def to_update(self) -> Update:
-        if not self._synced_state:
+        if self._batch is not None:
+            raise RuntimeError("cannot create an update during a batch edit")
+        if self._baseline is None:
             complete = self._to_new()
             body = NewBody(payload=complete)
             update = Update(id=self.uuid, body=body)
@@ -345,13 +562,17 @@ class TodoItem(pydantic.BaseModel):
         return update
 
     def _to_new(self) -> TodoApiObject:
-        if self._synced_state:
+        if self._baseline is not None:
             msg = (
                 f"current version exists for todo, use {self._to_edit.__name__} instead"
             )
             raise ValueError(msg)
 
         self.modification_date = Util.now()
+        return self._to_api_object(evening=self.is_evening)
+
+    def _to_api_object(self, evening: bool | None = None) -> TodoApiObject:
+        """Complete representation of the current local state."""
         return TodoApiObject(
             index=self.index,
             title=self.title,
@@ -367,7 +588,7 @@ class TodoItem(pydantic.BaseModel):
             instance_creation_paused=self.instance_creation_paused,
             projects=self._projects,
             areas=self._areas,
-            evening=self.is_evening,
+            evening=self._evening if evening is None else evening,
             tags=self.tags,
             type=self._type,
             due_date_suppression_date=self.due_date_suppression_date,
@@ -390,14 +611,16 @@ class TodoItem(pydantic.BaseModel):
         )
 
     def _to_edit(self) -> TodoDeltaApiObject:
-        if not self._synced_state:
+        baseline = self._baseline
+        if baseline is None:
             msg = f"no current version exists for todo, use {self._to_new.__name__} instead"
             raise ValueError(msg)
 
-        keys = self.model_dump(by_alias=False).keys()
+        # fields missing from the baseline still have their synced value
+        keys = EDIT_FIELDS.intersection(baseline).union(EDITED_IN_PLACE_FIELDS)
         edits = {}
         for key in keys:
-            current_value = getattr(self._synced_state, key)
+            current_value = self._synced_value(baseline, key)
             new_value = getattr(self, key)
             if current_value == new_value:
                 continue
@@ -411,10 +634,69 @@ class TodoItem(pydantic.BaseModel):
             self._synced_state = complete_or_delta
 
         else:
-            delta = complete_or_delta.model_dump(by_alias=False, exclude_none=True)
-            for key in delta.keys():
-                new_value = getattr(complete_or_delta, key)
-                setattr(self._synced_state, key, new_value)
+            baseline = self._baseline
+            assert baseline is not None
+            # the delta was stamped when it was built, keep the item in sync with
+            # it so that it is unchanged again after the commit
+            self.modification_date = complete_or_delta.modification_date
+            for key in complete_or_delta.edited_fields():
+                self._set_synced_value(baseline, key, getattr(complete_or_delta, key))
+
+    def _value(self, key: str) -> Any:
+        """Current value of a field of the synced state."""
+        attr = SYNCED_ATTRS[key]
+        private = self.__pydantic_private__
+        assert private is not None
+        return private[attr] if attr in private else vars(self)[attr]
+
+    def _synced_value(self, baseline: dict[str, Any], key: str) -> Any:
+        if key in baseline:
+            value = baseline[key]
+            if type(value) is tuple:
+                return list(value)
+            if key in MODEL_FIELDS:
+                return value.model_copy(deep=True)
+            return value
+        if key in LIST_FIELDS:
+            return []
+        if key in MODEL_FIELDS:
+            return EMPTY_MODELS[key].model_copy(deep=True)
+        return self._value(key)
+
+    def _set_synced_value(self, baseline: dict[str, Any], key: str, value: Any) -> None:
+        if type(value) is list:
+            if value or key not in LIST_FIELDS:
+                baseline[key] = tuple(value)
+            else:
+                baseline.pop(key, None)
+        elif key in MODEL_FIELDS:
+            if value != EMPTY_MODELS[key]:
+                baseline[key] = value.model_copy(deep=True)
+            else:
+                baseline.pop(key, None)
+        elif value == self._value(key):
+            baseline.pop(key, None)
+        else:
+            baseline[key] = value
+
+    @property
+    def _synced_state(self) -> TodoApiObject | None:
+        """State of the item that is known to the server, built on access."""
+        baseline = self._baseline
+        if baseline is None:
+            return None
+        values = {key: self._synced_value(baseline, key) for key in SYNCED_ATTRS}
+        return construct_model(TodoApiObject, values, fields_set=API_FIELDS_SET)
+
+    @_synced_state.setter
+    def _synced_state(self, synced: TodoApiObject | None) -> None:
+        if synced is None:
+            self._baseline = None
+            return
+        baseline: dict[str, Any] = {}
+        for key in SYNCED_ATTRS:
+            self._set_synced_value(baseline, key, getattr(synced, key))
+        self._baseline = baseline
 
     @property
     def uuid(self) -> ShortUUID:
@@ -443,7 +725,7 @@ class TodoItem(pydantic.BaseModel):
             self._projects = [project]
 
         if not project:
-            self._projects.clear()
+            self._projects = []
             return
 
         # clear area
@@ -460,7 +742,7 @@ class TodoItem(pydantic.BaseModel):
     @area.setter
     def area(self, area: str | None) -> None:
         if not area:
-            self._areas.clear()
+            self._areas = []
             return
         self._areas = [area]
 
@@ -551,3 +833,75 @@ class TodoItem(pydantic.BaseModel):
         today = Util.today()
         self.destination = Destination.ANYTIME
         self.scheduled_date = today
+
+
+@contextmanager
+def batch_edit(items: Iterable[TodoItem]) -> Iterator[None]:
+    """Assign fields of items without validating every single assignment.
+
+    Each item is validated once when the block is left, checking only the fields
+    that were assigned. If the block raises or an item fails validation, the
+    assigned fields of all items are restored.
+    """
+    started: list[TodoItem] = []
+    try:
+        for item in {id(item): item for item in items}.values():
+            item._begin_batch()
+            started.append(item)
+        yield
+        for item in started:
+            item._validate_batch()
+    except BaseException:
+        for item in started:
+            item._end_batch(restore=True)
+        raise
+    for item in started:
+        item._end_batch(restore=False)
+
+
+DELTA_FIELD_ORDER = {
+    name: position for position, name in enumerate(TodoDeltaApiObject.model_fields)
+}
+# fields compared when computing the edits of an item
+EDIT_FIELDS = frozenset((*TodoItem.model_fields, *TodoItem.model_computed_fields))
+ITEM_FIELDS = frozenset(TodoItem.model_fields)
+# attribute of an item that holds each field of its synced state
+SYNCED_ATTRS = {
+    name: name if name in ITEM_FIELDS else f"_{name}"
+    for name in TodoApiObject.model_fields
+}
+# fields that can be modified in place, they are compared on every edit
+LIST_FIELDS = frozenset(
+    ("projects", "areas", "tags", "repeating_template", "delegate", "action_group")
+)
+MODEL_FIELDS = frozenset(("note", "xx"))
+EDITED_IN_PLACE_FIELDS = (LIST_FIELDS | MODEL_FIELDS) & EDIT_FIELDS
+# only compared against, items get their own note and xx
+EMPTY_MODELS: dict[str, pydantic.BaseModel] = {"note": Note(), "xx": XX()}
+# private attributes that hold synced fields, restored when a batch edit fails
+SYNCED_PRIVATE_ATTRS = frozenset(
+    attr for attr in SYNCED_ATTRS.values() if attr not in ITEM_FIELDS
+)
+# attributes whose synced value is kept before they are assigned the first time
+COPY_ON_WRITE = {
+    attr: key
+    for key, attr in SYNCED_ATTRS.items()
+    if key not in LIST_FIELDS and key not in MODEL_FIELDS
+}
+# fields sets of items and objects that have every field set, they are never
+# changed since assigning a field only adds names that are already included
+ITEM_FIELDS_SET = set(TodoItem.model_fields)
+API_FIELDS_SET = set(TodoApiObject.model_fields)
+# validates any subset of the fields of an item, see `batch_edit`
+PARTIAL_ITEM = pydantic.TypeAdapter(
+    TypedDict(
+        "PartialTodoItem",
+        {
+            name: Annotated[field.annotation, *field.metadata]  # pyright: ignore[reportGeneralTypeIssues]
+            if field.metadata
+            else field.annotation
+            for name, field in TodoItem.model_fields.items()
+        },
+        total=False,
+    )
+)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Any
+
+from things_cloud.models.todo import (
+    LIST_FIELDS,
+    XX,
+    Destination,
+    Note,
+    Status,
+    TodoApiObject,
+    TodoItem,
+    Type,
+    construct_model,
+)
+
+# shared by all views with an empty note or xx, never modify them
+DEFAULT_NOTE = Note()
+DEFAULT_XX = XX()
+
+
+@dataclass(frozen=True, slots=True)
+class TodoView:
+    """Read-only representation of a todo item that takes a fraction of its memory.
+
+    Lists are stored as tuples and equal strings and empty notes are shared. Use
+    `to_item` to get a `TodoItem` that can be edited and committed.
+    """
+
+    uuid: str
+    index: int
+    title: str
+    status: Status
+    destination: Destination
+    creation_date: datetime
+    modification_date: datetime
+    scheduled_date: datetime | None
+    today_index_reference_date: datetime | None
+    completion_date: datetime | None
+    due_date: datetime | None
+    trashed: bool
+    instance_creation_paused: bool
+    projects: tuple[str, ...]
+    areas: tuple[str, ...]
+    evening: bool
+    tags: tuple[Any, ...]
+    type: Type
+    due_date_suppression_date: datetime | None
+    repeating_template: tuple[str, ...]
+    repeater_migration_date: Any
+    delegate: tuple[Any, ...]
+    due_date_offset: int
+    last_alarm_interaction_date: datetime | None
+    action_group: tuple[str, ...]
+    leaves_tombstone: bool
+    instance_creation_count: int
+    today_index: int
+    reminder: time | None
+    instance_creation_start_date: datetime | None
+    repeater: Any
+    after_completion_reference_date: datetime | None
+    recurrence_rule: str | None
+    note: Note
+    xx: XX
+
+    @classmethod
+    def from_item(cls, item: TodoItem) -> TodoView:
+        """View of the current state of an item."""
+        return cls(
+            uuid=item.uuid,
+            index=item.index,
+            title=item.title,
+            status=item.status,
+            destination=item.destination,
+            creation_date=item.creation_date,
+            modification_date=item.modification_date,
+            scheduled_date=item.scheduled_date,
+            today_index_reference_date=item.today_index_reference_date,
+            completion_date=item.completion_date,
+            due_date=item.due_date,
+            trashed=item.trashed,
+            instance_creation_paused=item.instance_creation_paused,
+            projects=tuple(item._projects),
+            areas=tuple(item._areas),
+            evening=item._evening,
+            tags=tuple(item.tags),
+            type=item.type,
+            due_date_suppression_date=item.due_date_suppression_date,
+            repeating_template=tuple(item.repeating_template),
+            repeater_migration_date=item.repeater_migration_date,
+            delegate=tuple(item.delegate),
+            due_date_offset=item.due_date_offset,
+            last_alarm_interaction_date=item.last_alarm_interaction_date,
+            action_group=tuple(item.action_group),
+            leaves_tombstone=item.leaves_tombstone,
+            instance_creation_count=item.instance_creation_count,
+            today_index=item.today_index,
+            reminder=item.reminder,
+            instance_creation_start_date=item.instance_creation_start_date,
+            repeater=item.repeater,
+            after_completion_reference_date=item.after_completion_reference_date,
+            recurrence_rule=item.recurrence_rule,
+            note=DEFAULT_NOTE if item.note == DEFAULT_NOTE else item.note.model_copy(),
+            xx=DEFAULT_XX if item.xx == DEFAULT_XX else item.xx.model_copy(deep=True),
+        )
+
+    def to_item(self) -> TodoItem:
+        """Create an editable item that has the state of this view as synced state."""
+        values = {name: getattr(self, name) for name in TodoApiObject.model_fields}
+        for name in LIST_FIELDS:
+            values[name] = list(values[name])
+        values["note"] = self.note.model_copy()
+        values["xx"] = self.xx.model_copy(deep=True)
+        synced = construct_model(TodoApiObject, values)
+        return synced.to_todo(validate=False, uuid=self.uuid)
+
+    @property
+    def project(self) -> str | None:
+        return self.projects[0] if self.projects else None
+
+    @property
+    def area(self) -> str | None:
+        return self.areas[0] if self.areas else None
@@ -0,0 +1,7 @@
+from things_cloud.store.base import ItemStore  # noqa
+from things_cloud.store.compact import CompactStore  # noqa
+from things_cloud.store.lazy import LazyStore  # noqa
+from things_cloud.store.memory import MemoryStore  # noqa
+from things_cloud.store.sqlite import SQLiteStore  # noqa
+from things_cloud.store.query import Query  # noqa
+from things_cloud.store.snapshot import load_snapshot, save_snapshot  # noqa
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from abc import abstractmethod
+from collections.abc import Hashable, MutableMapping
+
+from things_cloud.models.todo import (
+    TodoApiObject,
+    TodoDeltaApiObject,
+    TodoItem,
+)
+from things_cloud.store.index import ItemIndex
+from things_cloud.store.query import Query
+
+
+class ItemStore(MutableMapping[str, TodoItem]):
+    """Materialized todo items keyed by uuid, plus the history offset they reflect.
+
+    Assigning an item also updates the secondary indexes, so an item that was
+    modified in place needs to be assigned again to be found by its new values.
+    """
+
+    def __init__(self) -> None:
+        self.offset: int | None = None
+        self.index = ItemIndex()
+        # set by a client while history was applied that only a checkpoint may
+        # save, together with the offset it belongs to
+        self.sync_pending = False
+
+    def __setitem__(self, uuid: str, item: TodoItem) -> None:
+        self._set(uuid, item)
+        self.index.add(uuid, item)
+
+    def __delitem__(self, uuid: str) -> None:
+        self._delete(uuid)
+        self.index.remove(uuid)
+
+    def add_payload(
+        self, uuid: str, payload: TodoApiObject, validate: bool = True
+    ) -> None:
+        """Store a new item received from the server."""
+        self[uuid] = payload.to_todo(validate=validate, uuid=uuid)
+
+    def apply_delta(self, uuid: str, delta: TodoDeltaApiObject) -> None:
+        """Apply edits received from the server, raises `KeyError` for unknown items."""
+        item = self[uuid]
+        delta.apply_edits(item)
+        self[uuid] = item  # mark as changed
+
+    @abstractmethod
+    def _set(self, uuid: str, item: TodoItem) -> None: ...
+
+    @abstractmethod
+    def _delete(self, uuid: str) -> None: ...
+
+    def find(self, index: str, value: Hashable) -> list[TodoItem]:
+        """Items with `value` in the secondary index `index`."""
+        return [self[uuid] for uuid in self.index.get(index, value)]
+
+    def query(self) -> Query:
+        return Query(self)
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Persist pending changes together with the current offset."""
+
+    def close(self) -> None:
+        if self.sync_pending:
+            return  # the changes since the last checkpoint are dropped
+        self.flush()
+
+    def __enter__(self) -> ItemStore:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def dump_item(item: TodoItem) -> tuple[str, str | None]:
+    """Serialize the local state and the synced baseline of an item."""
+    current = item._to_api_object().model_dump_json(by_alias=True)
+    synced = (
+        item._synced_state.model_dump_json(by_alias=True)
+        if item._synced_state
+        else None
+    )
+    return current, synced
+
+
+def load_item(uuid: str, current: str, synced: str | None) -> TodoItem:
+    item = TodoApiObject.model_validate_json(current).to_todo()
+    item._uuid = uuid
+    item._synced_state = (
+        TodoApiObject.model_validate_json(synced) if synced is not None else None
+    )
+    return item
@@ -0,0 +1,43 @@
+from collections.abc import Iterator
+
+from things_cloud.models.todo import TodoItem
+from things_cloud.models.view import TodoView
+from things_cloud.store.base import ItemStore
+
+
+class CompactStore(ItemStore):
+    """Non-persistent store that keeps items as compact, read-only views.
+
+    Meant for large mirrors that are mostly read. Getting an item builds a new
+    `TodoItem` from its view, with the stored state as synced state, so changes
+    to it are only kept once it is assigned again. Use `view` and `views` to
+    read without building items.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._views: dict[str, TodoView] = {}
+
+    def __getitem__(self, uuid: str) -> TodoItem:
+        return self._views[uuid].to_item()
+
+    def view(self, uuid: str) -> TodoView:
+        return self._views[uuid]
+
+    def views(self) -> Iterator[TodoView]:
+        return iter(self._views.values())
+
+    def _set(self, uuid: str, item: TodoItem) -> None:
+        self._views[uuid] = TodoView.from_item(item)
+
+    def _delete(self, uuid: str) -> None:
+        del self._views[uuid]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._views)
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def flush(self) -> None:
+        pass
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterable
+from datetime import datetime
+
+from things_cloud.models.todo import TodoApiObject, TodoItem
+
+# items are indexed either built or as the payload they are built from
+Indexable = TodoItem | TodoApiObject
+
+
+def _day(value: datetime | None) -> tuple[Hashable, ...]:
+    # dates from the server are timezone aware while local ones are naive,
+    # index by calendar day so both compare equal
+    return (value.date(),) if value else ()
+
+
+def _projects(item: Indexable) -> list[str]:
+    return item._projects if isinstance(item, TodoItem) else item.projects
+
+
+def _areas(item: Indexable) -> list[str]:
+    return item._areas if isinstance(item, TodoItem) else item.areas
+
+
+INDEXES: dict[str, Callable[[Indexable], Iterable[Hashable]]] = {
+    "scheduled_date": lambda item: _day(item.scheduled_date),
+    "due_date": lambda item: _day(item.due_date),
+    "project": _projects,
+    "area": _areas,
+    "status": lambda item: (item.status,),
+    "type": lambda item: (item.type,),
+    "trashed": lambda item: (item.trashed,),
+    "tag": lambda item: (tag for tag in item.tags if isinstance(tag, Hashable)),
+}
+
+
+class ItemIndex:
+    """Secondary indexes mapping field values to the uuids of matching items."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, defaultdict[Hashable, set[str]]] = {
+            name: defaultdict(set) for name in INDEXES
+        }
+        # index keys of each item in the order of `INDEXES`, equal key tuples are
+        # shared between items to keep the memory per item low
+        self._keys: dict[str, tuple[tuple[Hashable, ...], ...]] = {}
+        # shared key tuples and how often they are used, dropped when unused
+        self._shared_keys: dict[tuple[Hashable, ...], tuple[Hashable, ...]] = {}
+        self._key_refs: dict[tuple[Hashable, ...], int] = {}
+
+    def add(self, uuid: str, item: Indexable) -> None:
+        """Index an item, replacing the entries of its previous version."""
+        self.remove(uuid)
+        shared = self._shared_keys
+        refs = self._key_refs
+        keys = tuple(
+            shared.setdefault(values, values)
+            for values in (tuple(get_keys(item)) for get_keys in INDEXES.values())
+        )
+        for values in keys:
+            refs[values] = refs.get(values, 0) + 1
+        for name, values in zip(INDEXES, keys, strict=True):
+            for value in values:
+                self._entries[name][value].add(uuid)
+        self._keys[uuid] = keys
+
+    def remove(self, uuid: str) -> None:
+        keys = self._keys.pop(uuid, None)
+        if keys is None:
+            return
+        refs = self._key_refs
+        for name, values in zip(INDEXES, keys, strict=True):
+            entries = self._entries[name]
+            for value in values:
+                uuids = entries[value]
+                uuids.discard(uuid)
+                if not uuids:
+                    del entries[value]
+            refs[values] -= 1
+            if not refs[values]:
+                del refs[values]
+                del self._shared_keys[values]
+
+    def get(self, name: str, value: Hashable) -> frozenset[str]:
+        """Uuids of all items with `value` in the index `name`."""
+        try:
+            return frozenset(self._entries[name].get(value, ()))
+        except KeyError as key_err:
+            msg = f"unknown index {name}"
+            raise ValueError(msg) from key_err
+
+    def count(self, name: str, value: Hashable) -> int:
+        return len(self._entries[name].get(value, ()))
+
+    def values(self, name: str) -> list[Hashable]:
+        return list(self._entries[name])
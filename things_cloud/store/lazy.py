@@ -0,0 +1,56 @@
+from collections.abc import Iterator
+
+from things_cloud.models.todo import TodoApiObject, TodoDeltaApiObject, TodoItem
+from things_cloud.store.base import ItemStore
+
+
+class LazyStore(ItemStore):
+    """Non-persistent store that builds items on first access.
+
+    Items received from the server are kept as their decoded payload, later
+    edits are written into that payload. A `TodoItem` is only built once the item
+    is read, e.g. by a query that matches it, so a sync costs little for items
+    that are never looked at. Built items are not validated again, the payload
+    was validated when it was received.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._entries: dict[str, TodoItem | TodoApiObject] = {}
+
+    def __getitem__(self, uuid: str) -> TodoItem:
+        entry = self._entries[uuid]
+        if isinstance(entry, TodoApiObject):
+            # replacing the value keeps iterations over the store valid
+            entry = self._entries[uuid] = entry.to_todo(validate=False, uuid=uuid)
+        return entry
+
+    def add_payload(
+        self, uuid: str, payload: TodoApiObject, validate: bool = True
+    ) -> None:
+        self._entries[uuid] = payload
+        self.index.add(uuid, payload)
+
+    def apply_delta(self, uuid: str, delta: TodoDeltaApiObject) -> None:
+        payload = self._entries[uuid]
+        if isinstance(payload, TodoItem):
+            super().apply_delta(uuid, delta)
+            return
+        for key in delta.edited_fields():
+            setattr(payload, key, getattr(delta, key))
+        self.index.add(uuid, payload)
+
+    def _set(self, uuid: str, item: TodoItem) -> None:
+        self._entries[uuid] = item
+
+    def _delete(self, uuid: str) -> None:
+        del self._entries[uuid]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def flush(self) -> None:
+        pass
@@ -0,0 +1,30 @@
+from collections.abc import Iterator
+
+from things_cloud.models.todo import TodoItem
+from things_cloud.store.base import ItemStore
+
+
+class MemoryStore(ItemStore):
+    """Non-persistent store, state is lost when the process exits."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._items: dict[str, TodoItem] = {}
+
+    def __getitem__(self, uuid: str) -> TodoItem:
+        return self._items[uuid]
+
+    def _set(self, uuid: str, item: TodoItem) -> None:
+        self._items[uuid] = item
+
+    def _delete(self, uuid: str) -> None:
+        del self._items[uuid]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def flush(self) -> None:
+        pass
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import heapq
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass, field, replace
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Literal
+
+from things_cloud.models.todo import TodoItem
+from things_cloud.store.index import INDEXES
+
+if TYPE_CHECKING:
+    from things_cloud.store.base import ItemStore
+
+OrderField = Literal["index", "today_index"]
+
+
+@dataclass(frozen=True)
+class Query:
+    """Filter, order and page through the items of a store.
+
+    Every method returns a new query. Equality filters on an indexed field
+    (see `INDEXES`) let the query start from the smallest matching index
+    entry instead of scanning all items; the remaining filters are then checked
+    on the candidates only.
+    """
+
+    store: ItemStore
+    fields: dict[str, Any] = field(default_factory=dict)
+    predicates: tuple[Callable[[TodoItem], bool], ...] = ()
+    order: OrderField = "index"
+    descending: bool = False
+    limit_: int | None = None
+    offset_: int = 0
+
+    def where(self, **fields: Any) -> Query:
+        """Keep items whose fields equal the given values.
+
+        Indexed fields are matched by their index keys: `project`, `area` and
+        `tag` match any of the item's uuids or tags, `scheduled_date` and
+        `due_date` take a `date`. `None` matches items without any key, e.g.
+        `where(project=None)` matches items that are not in a project.
+        """
+        return replace(self, fields={**self.fields, **fields})
+
+    def filter(self, predicate: Callable[[TodoItem], bool]) -> Query:
+        return replace(self, predicates=(*self.predicates, predicate))
+
+    def order_by(self, order: OrderField, descending: bool = False) -> Query:
+        return replace(self, order=order, descending=descending)
+
+    def limit(self, limit: int) -> Query:
+        return replace(self, limit_=limit)
+
+    def offset(self, offset: int) -> Query:
+        return replace(self, offset_=offset)
+
+    def plan(self) -> tuple[str, Hashable] | None:
+        """Index lookup the query starts from, `None` for a full scan."""
+        # items without keys are not in the index, they can only be scanned for
+        indexed = [
+            (name, value)
+            for name, value in self.fields.items()
+            if name in INDEXES and value is not None
+        ]
+        if not indexed:
+            return None
+        return min(indexed, key=lambda lookup: self.store.index.count(*lookup))
+
+    def _candidates(self) -> Iterator[TodoItem]:
+        plan = self.plan()
+        if plan is None:
+            yield from self.store.values()
+            return
+        for uuid in self.store.index.get(*plan):
+            yield self.store[uuid]
+
+    def _matches(self, item: TodoItem) -> bool:
+        for name, value in self.fields.items():
+            if name in INDEXES:
+                keys = INDEXES[name](item)
+                if value is None:
+                    if next(iter(keys), None) is not None:
+                        return False
+                elif value not in keys:
+                    return False
+            elif getattr(item, name) != value:
+                return False
+        return all(predicate(item) for predicate in self.predicates)
+
+    def all(self) -> list[TodoItem]:
+        matches = (item for item in self._candidates() if self._matches(item))
+        key = attrgetter(self.order)
+        if self.limit_ is None:
+            ordered = sorted(matches, key=key, reverse=self.descending)
+            return ordered[self.offset_ :]
+        # only keep the items needed for the requested page
+        select = heapq.nlargest if self.descending else heapq.nsmallest
+        return select(self.offset_ + self.limit_, matches, key=key)[self.offset_ :]
+
+    def first(self) -> TodoItem | None:
+        items = self.limit(1).all()
+        return items[0] if items else None
+
+    def count(self) -> int:
+        return sum(1 for item in self._candidates() if self._matches(item))
+
+    def __iter__(self) -> Iterator[TodoItem]:
+        return iter(self.all())
@@ -0,0 +1,82 @@
+import os
+import pickle
+import struct
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from things_cloud.models.todo import TodoItem
+
+MAGIC = b"TCSNAP"
+# bump with every change to the pickled state of an item:
+# 2: changed fields are tracked
+# 3: items keep a baseline of their diverged fields instead of the synced state
+# 4: the baseline also keeps copies of non-empty notes and xx
+VERSION = 4
+HEADER = struct.Struct(f"!{len(MAGIC)}sHq")  # magic, version, offset
+
+# classes a snapshot may contain, anything else is rejected on load
+ALLOWED_GLOBALS = {
+    "things_cloud.models.todo": {
+        "TodoItem",
+        "TodoApiObject",
+        "Note",
+        "XX",
+        "Status",
+        "Destination",
+        "Type",
+    },
+    "datetime": {"datetime", "date", "time", "timezone", "timedelta"},
+}
+
+
+@dataclass
+class Snapshot:
+    history_key: str
+    offset: int
+    items: list[TodoItem]
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if name not in ALLOWED_GLOBALS.get(module, ()):
+            msg = f"unexpected object in snapshot: {module}.{name}"
+            raise pickle.UnpicklingError(msg)
+        return super().find_class(module, name)
+
+
+def save_snapshot(
+    path: str | os.PathLike[str],
+    history_key: str,
+    offset: int,
+    items: Iterable[TodoItem],
+) -> None:
+    """Write items including their synced baseline to a binary snapshot file.
+
+    The file is written next to the target and moved into place, so an existing
+    snapshot is never left half-written.
+    """
+    tmp_path = f"{os.fspath(path)}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, offset))
+        pickle.dump((history_key, list(items)), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str | os.PathLike[str]) -> Snapshot:
+    """Read a snapshot written by `save_snapshot`.
+
+    Items are restored as they were saved, without running pydantic validation.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("not a snapshot file")
+        magic, version, offset = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot file")
+        if version != VERSION:
+            msg = f"unsupported snapshot version {version}"
+            raise ValueError(msg)
+        history_key, items = _Unpickler(f).load()
+    return Snapshot(history_key=history_key, offset=offset, items=items)
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+
+from structlog import get_logger
+
+from things_cloud.models.todo import TodoItem
+from things_cloud.store.base import ItemStore, dump_item, load_item
+
+log = get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    uuid TEXT PRIMARY KEY,
+    current TEXT NOT NULL,
+    synced TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+class SQLiteStore(ItemStore):
+    """Store backed by a SQLite database file.
+
+    All items are loaded into memory when the store is opened. Changes are
+    written in a single transaction on `flush`, so the saved offset always
+    matches the saved items.
+
+    The store may be used from another thread than the one that opened it,
+    e.g. by a `Poller`. The connection is guarded by a lock, the items are
+    not, so only one thread should change them at a time.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        super().__init__()
+        # a poller flushes from its own thread
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(SCHEMA)
+        self._items: dict[str, TodoItem] = {}
+        for uuid, current, synced in self._conn.execute(
+            "SELECT uuid, current, synced FROM items"
+        ):
+            item = load_item(uuid, current, synced)
+            self._items[uuid] = item
+            self.index.add(uuid, item)
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'offset'"
+        ).fetchone()
+        self.offset = row[0] if row else None
+        self._dirty: set[str] = set()
+        self._deleted: set[str] = set()
+        log.debug("loaded store", path=str(path), items=len(self._items))
+
+    def __getitem__(self, uuid: str) -> TodoItem:
+        return self._items[uuid]
+
+    def _set(self, uuid: str, item: TodoItem) -> None:
+        self._items[uuid] = item
+        self._dirty.add(uuid)
+        self._deleted.discard(uuid)
+
+    def _delete(self, uuid: str) -> None:
+        del self._items[uuid]
+        self._dirty.discard(uuid)
+        self._deleted.add(uuid)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def flush(self) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO items (uuid, current, synced) VALUES (?, ?, ?)",
+                ((uuid, *dump_item(self._items[uuid])) for uuid in self._dirty),
+            )
+            self._conn.executemany(
+                "DELETE FROM items WHERE uuid = ?",
+                ((uuid,) for uuid in self._deleted),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('offset', ?)",
+                (self.offset,),
+            )
+        self._dirty.clear()
+        self._deleted.clear()
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            self._conn.close()